@@ -0,0 +1,43 @@
+"""Synthetic assignments shared by the model benchmarks."""
+
+import datetime
+from typing import Optional
+
+
+def category(name: str, weight: str, points: str) -> dict:
+    return dict(enabled=True, name=name, minutes=None, weight=weight, points=points)
+
+
+def problem(index: int) -> dict:
+    """A problem with automated and review grading, varied enough to exercise decimal sharing."""
+
+    return dict(
+        short=f"problem{index}",
+        title=f"Problem {index}",
+        relative_path=f"problem{index}",
+        grading=dict(
+            enabled=True,
+            weight=str(1 + index % 3),
+            points="10",
+            automated=category("Automated tests", "3", str(10 + index % 5)),
+            review=category("Code review", "1", "5"),
+            manual=None),
+        authors=[dict(name="Author", email="author@example.com")],
+        topics=["arrays", "recursion"],
+        notes=None,
+        difficulty="medium")
+
+
+def assignment(problems: int, built: Optional[datetime.datetime] = None) -> dict:
+    """Serialized assignment with the given number of problems."""
+
+    built = built or datetime.datetime(2024, 1, 1)
+    return dict(
+        short="homework",
+        title="Homework",
+        authors=[dict(name="Author", email="author@example.com")],
+        problems=[problem(index) for index in range(problems)],
+        grading=dict(points=100),
+        extra=None,
+        notes=None,
+        meta=dict(built=built.strftime("%Y-%m-%d %H:%M:%S"), curricula="0"))
@@ -0,0 +1,114 @@
+"""Round-trip latency and CPU of Interactive reads.
+
+Sends a line to an echo process and waits for it to come back, many
+times over, once through Interactive and once through a copy of the
+loop Readable used to run, which slept a millisecond between polls.
+A delay makes the echo process think before answering, which shows
+the CPU polling spends while a test waits on a slow program.
+
+    python -m benchmarks.interactive_latency [--rounds 1000] [--delay 0]
+"""
+
+import os
+import sys
+import time
+import timeit
+import argparse
+import subprocess
+
+from curricula.library import process
+
+ECHO = """\
+import sys, time
+delay = float(sys.argv[1])
+for line in sys.stdin:
+    if delay:
+        time.sleep(delay)
+    sys.stdout.write(line)
+    sys.stdout.flush()
+"""
+
+
+class PollingReader:
+    """The read loop Readable used before it waited on a selector."""
+
+    POLL = 0.001
+
+    def __init__(self, file):
+        self.file = file
+        self.history = b""
+        os.set_blocking(file.fileno(), False)
+
+    def read(self, condition, timeout: float):
+        buffer = b""
+        timeout_time = timeit.default_timer() + timeout
+        while True:
+            data = self.file.read()
+            if data is not None:
+                buffer += data
+                if condition(buffer):
+                    break
+            if timeit.default_timer() >= timeout_time:
+                raise process.TimeoutExpired(buffer=buffer)
+            time.sleep(self.POLL)
+        self.history += buffer
+        return buffer
+
+
+def line_complete(buffer: bytes) -> bool:
+    return buffer.endswith(b"\n")
+
+
+def measure(write, read, rounds: int):
+    """Return the mean seconds per round trip and the parent CPU seconds."""
+
+    start_wall = timeit.default_timer()
+    start_cpu = time.process_time()
+    for i in range(rounds):
+        write(b"%d\n" % i)
+        read()
+    return (timeit.default_timer() - start_wall) / rounds, time.process_time() - start_cpu
+
+
+def selector(rounds: int, delay: float):
+    interactive = process.interact(sys.executable, "-u", "-c", ECHO, str(delay))
+    with interactive:
+        def write(data: bytes):
+            interactive.stdin.write(data, end=b"")
+
+        result = measure(write, lambda: interactive.stdout.read(condition=line_complete, timeout=5), rounds)
+        interactive.stdin.file.close()
+        interactive.close(timeout=5)
+    return result
+
+
+def polling(rounds: int, delay: float):
+    child = subprocess.Popen(
+        (sys.executable, "-u", "-c", ECHO, str(delay)),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE)
+    with child:
+        reader = PollingReader(child.stdout)
+
+        def write(data: bytes):
+            child.stdin.write(data)
+            child.stdin.flush()
+
+        result = measure(write, lambda: reader.read(line_complete, timeout=5), rounds)
+        child.stdin.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rounds", type=int, default=1000)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds the echo process waits before answering")
+    args = parser.parse_args()
+
+    for name, run in (("selector", selector), ("polling", polling)):
+        latency, cpu = run(args.rounds, args.delay)
+        print(f"{name:>8}: {latency * 1e6:8.1f} us per round trip, {cpu * 1e3:8.1f} ms parent CPU")
+
+
+if __name__ == "__main__":
+    main()
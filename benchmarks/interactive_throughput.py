@@ -0,0 +1,124 @@
+"""Throughput of streaming a large output through an Interactive recording.
+
+A child answers each prompt with a 64 KiB reply, and the parent sends
+prompts and reads replies inside Interactive.recording until size
+megabytes have gone through. Like a chatty test, every exchange adds
+a little to a large history. With --baseline, the same exchanges go
+through a copy of the old reader, which kept history as bytes grown
+by concatenation; it is quadratic, so try a smaller size first.
+
+    python -m benchmarks.interactive_throughput [--size 100] [--baseline]
+"""
+
+import os
+import sys
+import time
+import timeit
+import argparse
+import resource
+import subprocess
+
+from curricula.library import process
+
+REPLY_SIZE = 65536
+
+RESPONDER = f"""\
+import sys
+reply = b"x" * {REPLY_SIZE - 1} + b"\\n"
+for line in sys.stdin:
+    sys.stdout.buffer.write(reply)
+    sys.stdout.flush()
+"""
+
+
+def reply_complete(buffer: bytes) -> bool:
+    return len(buffer) >= REPLY_SIZE
+
+
+def peak_rss_megabytes() -> float:
+    """Peak resident set size of this process so far."""
+
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / 1024 if sys.platform != "darwin" else usage / 1024 / 1024
+
+
+def current(rounds: int):
+    """Exchange through Interactive, returning bytes recorded, seconds and CPU seconds."""
+
+    interactive = process.interact(sys.executable, "-u", "-c", RESPONDER)
+    with interactive:
+        start_wall = timeit.default_timer()
+        start_cpu = time.process_time()
+        with interactive.recording() as recording:
+            for _ in range(rounds):
+                interactive.stdin.write(b"")
+                interactive.stdout.read(condition=reply_complete, timeout=30)
+        elapsed = timeit.default_timer() - start_wall, time.process_time() - start_cpu
+        interactive.stdin.file.close()
+        interactive.close(timeout=5)
+    return len(recording.stdout), *elapsed
+
+
+class ConcatenatingReader:
+    """The old Readable, keeping history as bytes on the instance."""
+
+    def __init__(self, file):
+        self.file = file
+        self.history = b""
+        os.set_blocking(file.fileno(), False)
+
+    def read(self, condition) -> bytes:
+        buffer = b""
+        while True:
+            data = self.file.read()
+            if data is not None:
+                buffer += data
+                if condition(buffer):
+                    break
+            time.sleep(0.001)
+        self.history += buffer
+        return buffer
+
+
+def baseline(rounds: int):
+    """Exchange with bytes concatenation like the old Readable did."""
+
+    child = subprocess.Popen(
+        (sys.executable, "-u", "-c", RESPONDER),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE)
+    with child:
+        reader = ConcatenatingReader(child.stdout)
+        start_wall = timeit.default_timer()
+        start_cpu = time.process_time()
+        index = len(reader.history)
+        for _ in range(rounds):
+            child.stdin.write(b"\n")
+            child.stdin.flush()
+            reader.read(reply_complete)
+        recorded = reader.history[index:]
+        elapsed = timeit.default_timer() - start_wall, time.process_time() - start_cpu
+        child.stdin.close()
+    return len(recorded), *elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--size", type=int, default=100, help="megabytes to stream")
+    parser.add_argument("--baseline", action="store_true", help="also run the old concatenating reader")
+    args = parser.parse_args()
+
+    rounds = args.size * 1024 * 1024 // REPLY_SIZE
+    runs = [("history", current)]
+    if args.baseline:
+        runs.append(("baseline", baseline))
+    for name, run in runs:
+        recorded, wall, cpu = run(rounds)
+        megabytes = recorded / 1024 / 1024
+        print(
+            f"{name:>8}: {megabytes:.0f} MB in {rounds} replies in {wall:.2f} s ({megabytes / wall:.0f} MB/s), "
+            f"{cpu:.2f} s parent CPU, peak RSS {peak_rss_megabytes():.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Memory and garbage collection cost of loaded assignments.
+
+Loads an assignment with many problems, reporting the time taken, the
+memory held by the models, the objects the cyclic garbage collector
+has to track, and how many objects are left for it to find once the
+assignment is dropped. Models hold their parents weakly, so that last
+number should be zero: dropping an assignment frees it right away.
+
+    python -m benchmarks.models_memory [--problems 10000] [--lazy]
+"""
+
+import gc
+import copy
+import timeit
+import argparse
+import tracemalloc
+
+from curricula.models import Assignment
+
+from .assignments import assignment
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--problems", type=int, default=10_000)
+    parser.add_argument("--lazy", action="store_true", help="defer loading problems until they are accessed")
+    args = parser.parse_args()
+
+    data = assignment(args.problems)
+
+    # Time without tracing, since tracemalloc slows allocation down
+    start = timeit.default_timer()
+    Assignment.load(copy.deepcopy(data), lazy=args.lazy)
+    elapsed = timeit.default_timer() - start
+
+    fresh = copy.deepcopy(data)
+    gc.collect()
+    gc.disable()
+    tracked = len(gc.get_objects())
+    tracemalloc.start()
+    loaded = Assignment.load(fresh, lazy=args.lazy)
+    del fresh
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tracked = len(gc.get_objects()) - tracked
+
+    start = timeit.default_timer()
+    loaded.grading.weight()
+    first = timeit.default_timer() - start
+    start = timeit.default_timer()
+    for _ in range(1000):
+        loaded.grading.weight()
+    weight = (timeit.default_timer() - start) / 1000
+
+    del loaded
+    unreachable = gc.collect()
+    gc.enable()
+
+    print(f"problems:            {args.problems}{' (lazy)' if args.lazy else ''}")
+    print(f"load:                {elapsed:.3f} s")
+    print(f"held after load:     {held / 1024 / 1024:.1f} MB ({held / args.problems:.0f} bytes per problem)")
+    print(f"peak while loading:  {peak / 1024 / 1024:.1f} MB")
+    print(f"objects tracked:     {tracked} new for the cyclic collector")
+    print(f"first weight:        {first * 1e3:.2f} ms")
+    print(f"cached weight:       {weight * 1e6:.2f} us per call")
+    print(f"left for collector:  {unreachable} objects after dropping the assignment")
+
+
+if __name__ == "__main__":
+    main()
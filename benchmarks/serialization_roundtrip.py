@@ -0,0 +1,82 @@
+"""Round trip of assignments, problems and runtimes through serialization.
+
+For every available backend, encodes each kind of record to JSON and
+decodes it back into models, reporting the best of a few repeats. The
+records are an assignment with many problems, those problems one at a
+time, and a batch of runtimes like the ones written to reports. There
+is no Runtime.load, so runtimes are only decoded back to dictionaries.
+
+    python -m benchmarks.serialization_roundtrip [--problems 10000] [--runtimes 10000]
+"""
+
+import timeit
+import argparse
+from pathlib import Path
+from typing import Callable
+
+from curricula.models import Assignment, Problem
+from curricula.library import serialization
+from curricula.library.process import ResourceUsage, Runtime
+
+from .assignments import assignment
+
+
+def runtime(index: int) -> Runtime:
+    """A finished test run with some output."""
+
+    return Runtime(
+        args=("./main", str(index)),
+        cwd=Path("/tmp/sandbox"),
+        stdin=b"1 2 3\n",
+        stdout=b"expected output line\n" * 40,
+        stderr=b"",
+        elapsed=0.0123,
+        code=0,
+        timeout=5.0,
+        usage=ResourceUsage(
+            user_time=0.01,
+            system_time=0.002,
+            max_rss=4096,
+            voluntary_context_switches=3,
+            involuntary_context_switches=1))
+
+
+def best(function: Callable[[], object], repeat: int) -> float:
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def measure(name: str, dump: Callable[[], object], load: Callable[[object], object], repeat: int) -> str:
+    """Time encoding a dumped record and decoding it back into models."""
+
+    text = serialization.dumps(dump())
+    encode = best(lambda: serialization.dumps(dump()), repeat)
+    decode = best(lambda: load(serialization.loads(text)), repeat)
+    return f"  {name:<12} dump {encode:7.3f} s  load {decode:7.3f} s  round trip {encode + decode:7.3f} s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--problems", type=int, default=10_000)
+    parser.add_argument("--runtimes", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    loaded = Assignment.load(assignment(args.problems))
+    problems = list(loaded.problems)
+    runtimes = [runtime(index) for index in range(args.runtimes)]
+
+    for name in serialization.BACKENDS:
+        serialization.set_backend(name)
+        print(f"{name}:")
+        print(measure("assignment", loaded.dump, Assignment.load, args.repeat))
+        print(measure(
+            "problems",
+            lambda: [problem.dump() for problem in problems],
+            lambda data: [Problem.load(problem) for problem in data],
+            args.repeat))
+        print(measure("runtimes", lambda: [record.dump() for record in runtimes], lambda data: data, args.repeat))
+    serialization.set_backend(None)
+
+
+if __name__ == "__main__":
+    main()
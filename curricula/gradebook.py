@@ -0,0 +1,232 @@
+import csv
+import math
+import operator
+from array import array
+from decimal import Decimal, ROUND_HALF_UP
+from dataclasses import dataclass
+from typing import Dict, List, Optional, TextIO, Tuple, Union
+
+from .models import Assignment
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = (
+    "CATEGORIES",
+    "Column",
+    "Gradebook")
+
+CATEGORIES = ("automated", "review", "manual")
+
+Number = Union[int, float, Decimal]
+
+# Results within this many half quanta of a rounding boundary are recomputed exactly
+BOUNDARY_TOLERANCE = 1e-6
+
+
+@dataclass(eq=False)
+class Column:
+    """A single problem category that students earn points in."""
+
+    short: str
+    category: str
+
+    # Assignment points awarded per point earned in the category
+    coefficient: Decimal
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.short, self.category
+
+
+def _columns(assignment: Assignment) -> List[Column]:
+    """Fold every weight into one coefficient per problem category.
+
+    A problem contributes its share of the assignment's total weight,
+    split between its categories by their own weights, and each point
+    earned is scaled by the points the category is out of. Disabled
+    grading is kept as a zero coefficient so that the layout survives
+    it being toggled.
+    """
+
+    total_weight = assignment.grading.weight()
+    points = Decimal(assignment.grading.points)
+
+    columns = []
+    for problem in assignment.problems:
+        grading = problem.grading
+        for name in CATEGORIES:
+            category = getattr(grading, name)
+            if category is None:
+                continue
+
+            coefficient = Decimal(0)
+            if getattr(grading, f"is_{name}") and total_weight and grading.weight_total and category.points:
+                coefficient = (
+                    points
+                    * grading.weight / total_weight
+                    * category.weight / grading.weight_total
+                    / category.points)
+            columns.append(Column(short=problem.short, category=name, coefficient=coefficient))
+    return columns
+
+
+class Gradebook:
+    """Scores for every student in an assignment, computed in bulk.
+
+    Weights are compiled once into a coefficient per problem category,
+    so each student's total is a dot product of their earned points
+    with the coefficients, and the whole class is a single matrix
+    product. Computation is in floating point, with numpy if it is
+    installed; results are rounded to Decimal, recomputing exactly any
+    that land close enough to a rounding boundary that float error
+    could change them. Call compile again after changing weights.
+    """
+
+    assignment: Assignment
+    columns: List[Column]
+    students: List[str]
+
+    def __init__(self, assignment: Assignment):
+        self.assignment = assignment
+        self.columns = []
+        self.students = []
+        self._column_index: Dict[Tuple[str, str], int] = {}
+        self._student_index: Dict[str, int] = {}
+        self._earned: List[List[Number]] = []
+        self._matrix = None
+        self.compile()
+
+    def compile(self):
+        """Recompute coefficients, keeping scores already entered."""
+
+        columns = _columns(self.assignment)
+        keys = [column.key for column in columns]
+        if keys != [column.key for column in self.columns]:
+            previous = self._column_index
+            self._earned = [
+                [row[previous[key]] if key in previous else 0 for key in keys]
+                for row in self._earned]
+            self._column_index = {key: i for i, key in enumerate(keys)}
+            self._matrix = None
+        self.columns = columns
+
+    def add(self, student: str, earned: Dict[Tuple[str, str], Number]):
+        """Enter the points a student earned, keyed by problem short and category."""
+
+        row = self._row(student)
+        for key, value in earned.items():
+            index = self._column_index.get(key)
+            if index is None:
+                raise ValueError(f"no graded category {key[1]} in problem {key[0]}")
+            row[index] = value
+        self._matrix = None
+
+    def set(self, student: str, short: str, category: str, earned: Number):
+        """Enter the points earned in a single category."""
+
+        self.add(student, {(short, category): earned})
+
+    def _row(self, student: str) -> List[Number]:
+        index = self._student_index.get(student)
+        if index is None:
+            index = self._student_index[student] = len(self.students)
+            self.students.append(student)
+            self._earned.append([0] * len(self.columns))
+        return self._earned[index]
+
+    def _build(self):
+        """Convert entered points to floats once per batch of changes."""
+
+        if self._matrix is not None:
+            return
+        if numpy is not None:
+            self._matrix = numpy.array(self._earned, dtype=numpy.float64).reshape(len(self._earned), len(self.columns))
+        else:
+            self._matrix = [array("d", map(float, row)) for row in self._earned]
+
+    def _products(self, coefficients: List[Decimal]) -> List[float]:
+        """Multiply every student's points by the coefficients."""
+
+        self._build()
+        if numpy is not None:
+            return (self._matrix @ numpy.array(coefficients, dtype=numpy.float64)).tolist()
+        vector = array("d", map(float, coefficients))
+        return [sum(map(operator.mul, row, vector)) for row in self._matrix]
+
+    def _round(
+            self,
+            values: List[float],
+            coefficients: List[Decimal],
+            quantum: Decimal,
+            rounding: str) -> List[Decimal]:
+        """Round to the quantum, falling back to exact arithmetic at boundaries.
+
+        Every rounding mode only changes its answer at multiples of half
+        the quantum, so values far from those are safe to round as is.
+        """
+
+        step = float(quantum) / 2
+        results = []
+        for student, value in enumerate(values):
+            if not math.isfinite(value) or abs(value / step - round(value / step)) < BOUNDARY_TOLERANCE:
+                value = sum(Decimal(earned) * coefficient for earned, coefficient in zip(self._earned[student], coefficients))
+            results.append(Decimal(value).quantize(quantum, rounding=rounding))
+        return results
+
+    def totals(self, quantum: Decimal = Decimal("0.01"), rounding: str = ROUND_HALF_UP) -> List[Decimal]:
+        """Assignment score of every student, in order of students."""
+
+        coefficients = [column.coefficient for column in self.columns]
+        return self._round(self._products(coefficients), coefficients, quantum, rounding)
+
+    def category_totals(
+            self,
+            quantum: Decimal = Decimal("0.01"),
+            rounding: str = ROUND_HALF_UP) -> Dict[str, List[Decimal]]:
+        """Assignment points earned through each category by every student."""
+
+        result = {}
+        for name in CATEGORIES:
+            coefficients = [column.coefficient if column.category == name else Decimal(0) for column in self.columns]
+            result[name] = self._round(self._products(coefficients), coefficients, quantum, rounding)
+        return result
+
+    def total(self, student: str, quantum: Decimal = Decimal("0.01"), rounding: str = ROUND_HALF_UP) -> Optional[Decimal]:
+        """Exact score of a single student."""
+
+        index = self._student_index.get(student)
+        if index is None:
+            return None
+        value = sum(
+            Decimal(earned) * column.coefficient
+            for earned, column in zip(self._earned[index], self.columns))
+        return Decimal(value).quantize(quantum, rounding=rounding)
+
+    def export(self, file: TextIO, columns: bool = False, quantum: Decimal = Decimal("0.01")):
+        """Write a CSV with a row per student.
+
+        Each row has the student, their points through each category and
+        their total. If columns is set, the raw points entered for every
+        problem category are included before the totals.
+        """
+
+        writer = csv.writer(file)
+        header = ["student"]
+        if columns:
+            header.extend(f"{column.short} {column.category}" for column in self.columns)
+        header.extend(CATEGORIES)
+        header.append("total")
+        writer.writerow(header)
+
+        categories = self.category_totals(quantum)
+        totals = self.totals(quantum)
+        for index, student in enumerate(self.students):
+            row = [student]
+            if columns:
+                row.extend(self._earned[index])
+            row.extend(categories[name][index] for name in CATEGORIES)
+            row.append(totals[index])
+            writer.writerow(row)
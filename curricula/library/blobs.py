@@ -0,0 +1,263 @@
+import os
+import json
+import stat
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from .files import distribute_file, DISTRIBUTION_METHODS
+
+__all__ = ("ManifestEntry", "Manifest", "BlobStore")
+
+# Bump whenever the manifest layout changes
+MANIFEST_FORMAT = 1
+
+# Blobs are shared by hardlinks, so they must never be modified
+BLOB_MODE = 0o444
+
+
+@dataclass(eq=False)
+class ManifestEntry:
+    """A single file in a manifest."""
+
+    digest: str
+    size: int
+    executable: bool = False
+
+
+@dataclass(eq=False)
+class Manifest:
+    """Maps paths relative to a tree's root to the blobs of their contents."""
+
+    files: Dict[str, ManifestEntry] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        """Total size of the tree before deduplication."""
+
+        return sum(entry.size for entry in self.files.values())
+
+    def digests(self) -> Iterator[str]:
+        """Every blob referenced, possibly with repeats."""
+
+        return (entry.digest for entry in self.files.values())
+
+    def dump(self) -> dict:
+        """Compact serialization, one list per file."""
+
+        return dict(
+            format=MANIFEST_FORMAT,
+            files={path: [entry.digest, entry.size, entry.executable] for path, entry in sorted(self.files.items())})
+
+    @classmethod
+    def load(cls, data: dict) -> "Manifest":
+        """Deserialize, checking the format."""
+
+        if data.get("format") != MANIFEST_FORMAT:
+            raise ValueError(f"unsupported manifest format {data.get('format')}")
+        return cls(files={path: ManifestEntry(*entry) for path, entry in data["files"].items()})
+
+
+class BlobStore:
+    """Content-addressed store that deduplicates identical files.
+
+    Files are stored once per SHA-256 digest, sharded by prefix, and
+    trees are recorded as named manifests. Checking a manifest out
+    reflinks or hardlinks blobs into place where the filesystem allows,
+    so preparing a sandbox costs little I/O or space. Blobs are kept
+    read-only since hardlinked checkouts share them. Do not collect
+    garbage while other processes are adding to the store.
+    """
+
+    path: Path
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.blobs_path = path.joinpath("blobs")
+        self.manifests_path = path.joinpath("manifests")
+        self.blobs_path.mkdir(parents=True, exist_ok=True)
+        self.manifests_path.mkdir(parents=True, exist_ok=True)
+
+    def blob_path(self, digest: str) -> Path:
+        """Where the blob for a digest is stored."""
+
+        return self.blobs_path.joinpath(digest[:2], digest)
+
+    def __contains__(self, digest: str) -> bool:
+        return self.blob_path(digest).exists()
+
+    def _store(self, digest: str, write: Callable[[BinaryIO], Any]):
+        """Atomically add a blob unless it is already present."""
+
+        path = self.blob_path(digest)
+        if path.exists():
+            return
+        path.parent.mkdir(exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=str(path.parent), prefix=".")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                write(file)
+            os.chmod(temporary_path, BLOB_MODE)
+            os.replace(temporary_path, str(path))
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    def put_bytes(self, data: bytes) -> str:
+        """Store data, returning its digest."""
+
+        digest = hashlib.sha256(data).hexdigest()
+        self._store(digest, lambda file: file.write(data))
+        return digest
+
+    def put_file(self, path: Path) -> ManifestEntry:
+        """Store a file's contents, returning its manifest entry.
+
+        The file is hashed while it is copied into a temporary file,
+        so the stored blob always matches its digest even if the
+        source changes underneath.
+        """
+
+        digest = hashlib.sha256()
+        size = 0
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=str(self.blobs_path), prefix=".")
+        try:
+            with path.open("rb") as source, os.fdopen(file_descriptor, "wb") as file:
+                executable = bool(os.fstat(source.fileno()).st_mode & stat.S_IXUSR)
+                for chunk in iter(lambda: source.read(1024 * 1024), b""):
+                    digest.update(chunk)
+                    file.write(chunk)
+                    size += len(chunk)
+
+            blob_path = self.blob_path(digest.hexdigest())
+            if blob_path.exists():
+                os.unlink(temporary_path)
+            else:
+                blob_path.parent.mkdir(exist_ok=True)
+                os.chmod(temporary_path, BLOB_MODE)
+                os.replace(temporary_path, str(blob_path))
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.unlink(temporary_path)
+            raise
+
+        return ManifestEntry(digest=digest.hexdigest(), size=size, executable=executable)
+
+    def add_directory(self, source: Path, concurrency: int = None) -> Manifest:
+        """Store every file in a tree, hashing in parallel."""
+
+        paths = []
+        for root, _, names in os.walk(str(source), followlinks=True):
+            paths.extend(Path(root, name) for name in names)
+
+        with ThreadPoolExecutor(max_workers=concurrency or os.cpu_count()) as executor:
+            entries = executor.map(self.put_file, paths)
+            return Manifest(files={
+                path.relative_to(source).as_posix(): entry
+                for path, entry in zip(paths, entries)})
+
+    def save(self, name: str, manifest: Manifest):
+        """Record a manifest under a name, replacing any previous one."""
+
+        path = self.manifests_path.joinpath(f"{name}.json")
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=str(self.manifests_path), prefix=".")
+        try:
+            with os.fdopen(file_descriptor, "w") as file:
+                json.dump(manifest.dump(), file)
+            os.replace(temporary_path, str(path))
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    def manifest(self, name: str) -> Manifest:
+        """Read a named manifest, raising FileNotFoundError if missing."""
+
+        with self.manifests_path.joinpath(f"{name}.json").open() as file:
+            return Manifest.load(json.load(file))
+
+    def names(self) -> List[str]:
+        """Names of every saved manifest."""
+
+        return sorted(path.stem for path in self.manifests_path.glob("*.json"))
+
+    def remove(self, name: str):
+        """Forget a manifest; its blobs are freed by the next collection."""
+
+        self.manifests_path.joinpath(f"{name}.json").unlink(missing_ok=True)
+
+    def checkout(
+            self,
+            manifest: Manifest,
+            destination: Path,
+            writable: bool = False,
+            concurrency: int = None) -> Dict[str, int]:
+        """Materialize a manifest in a directory.
+
+        Files are reflinked, hardlinked or copied from their blobs as
+        in files.distribute_file. Hardlinked files are read-only and
+        shared with the store, so pass writable if the files will be
+        modified; they are then never hardlinked and get write
+        permission. Executables always get their own inode. Returns
+        how many files each method produced.
+        """
+
+        destination.mkdir(parents=True, exist_ok=True)
+        for relative_path in manifest.files:
+            destination.joinpath(relative_path).parent.mkdir(parents=True, exist_ok=True)
+
+        shared = set(DISTRIBUTION_METHODS)
+        if writable:
+            shared.discard("hardlink")
+
+        def materialize(item: Tuple[str, ManifestEntry]) -> str:
+            relative_path, entry = item
+            target = destination.joinpath(relative_path)
+            methods = shared - {"hardlink"} if entry.executable else shared
+            method = distribute_file(self.blob_path(entry.digest), target, methods)
+            if method != "hardlink":
+                mode = 0o644 if writable else BLOB_MODE
+                if entry.executable:
+                    mode |= 0o111
+                os.chmod(str(target), mode)
+            return method
+
+        used: Dict[str, int] = {}
+        with ThreadPoolExecutor(max_workers=concurrency or os.cpu_count()) as executor:
+            for method in executor.map(materialize, manifest.files.items()):
+                used[method] = used.get(method, 0) + 1
+        return used
+
+    def _blobs(self) -> Iterator[Path]:
+        """Every stored blob, skipping unfinished writes."""
+
+        for shard in self.blobs_path.iterdir():
+            if not shard.is_dir():
+                continue
+            for path in shard.iterdir():
+                if not path.name.startswith("."):
+                    yield path
+
+    def collect(self, keep: Iterable[Manifest] = ()) -> Tuple[int, int]:
+        """Delete blobs not referenced by any saved or given manifest.
+
+        Returns the number of blobs and bytes freed. Space held by
+        hardlinked checkouts is only released once they are deleted too.
+        """
+
+        referenced = set()
+        for name in self.names():
+            referenced.update(self.manifest(name).digests())
+        for manifest in keep:
+            referenced.update(manifest.digests())
+
+        count = 0
+        size = 0
+        for path in list(self._blobs()):
+            if path.name not in referenced:
+                size += path.stat().st_size
+                path.unlink(missing_ok=True)
+                count += 1
+        return count, size
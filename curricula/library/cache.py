@@ -0,0 +1,141 @@
+import os
+import pickle
+import tempfile
+import threading
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, List, Tuple
+
+__all__ = ("CacheStatistics", "DiskCache")
+
+# Fraction of max_size that eviction frees down to, so scans are amortized
+LOW_WATER = 0.9
+
+
+@dataclass(eq=False)
+class CacheStatistics:
+    """Counters for cache effectiveness."""
+
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+    def dump(self) -> dict:
+        """Serialize."""
+
+        return asdict(self)
+
+
+class DiskCache:
+    """Size-bounded LRU cache of pickled values in a directory.
+
+    Keys are expected to be hex digests. Recency is tracked through
+    each entry's modification time, which is bumped on every hit, so
+    the cache may be shared by several processes. Entries are written
+    atomically and unreadable entries are treated as misses.
+    """
+
+    path: Path
+    max_size: int
+    statistics: CacheStatistics
+
+    def __init__(self, path: Path, max_size: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_size = max_size
+        self.statistics = CacheStatistics()
+        self._lock = threading.Lock()
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())
+
+    def _entry_path(self, key: str) -> Path:
+        """Shard entries by key prefix to keep directories small."""
+
+        return self.path.joinpath(key[:2], key)
+
+    def _entries(self) -> List[Tuple[int, int, Path]]:
+        """List the modification time, size and path of every entry."""
+
+        entries = []
+        for shard in self.path.iterdir():
+            if not shard.is_dir():
+                continue
+            for path in shard.iterdir():
+                if path.name.startswith("."):
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return entries
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Load an entry and mark it as recently used."""
+
+        path = self._entry_path(key)
+        try:
+            with path.open("rb") as file:
+                value = pickle.load(file)
+            os.utime(str(path))
+        except FileNotFoundError:
+            with self._lock:
+                self.statistics.misses += 1
+            return default
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, OSError):
+            path.unlink(missing_ok=True)
+            with self._lock:
+                self.statistics.misses += 1
+            return default
+
+        with self._lock:
+            self.statistics.hits += 1
+        return value
+
+    def set(self, key: str, value: Any):
+        """Store an entry, evicting the least recently used if full."""
+
+        path = self._entry_path(key)
+        path.parent.mkdir(exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=str(path.parent), prefix=".")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, str(path))
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+        with self._lock:
+            self.statistics.stores += 1
+            self._size += path.stat().st_size
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """Delete the oldest entries until the cache is below the low-water mark.
+
+        Every eviction lists the whole cache, so freeing some headroom
+        keeps the following stores from each paying for a scan.
+        """
+
+        entries = sorted(self._entries())
+        self._size = sum(size for _, size, _ in entries)
+        if self._size <= self.max_size:
+            return
+        target = int(self.max_size * LOW_WATER)
+        for _, size, path in entries:
+            if self._size <= target:
+                break
+            path.unlink(missing_ok=True)
+            self._size -= size
+            self.statistics.evictions += 1
+
+    def clear(self):
+        """Delete every entry."""
+
+        with self._lock:
+            for _, _, path in self._entries():
+                path.unlink(missing_ok=True)
+            self._size = 0
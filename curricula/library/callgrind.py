@@ -1,12 +1,26 @@
 import os
-import tempfile
+import json
+import shutil
+import fnmatch
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Iterable, List, Dict, Callable, TextIO, TypeVar
 
 from . import process
-from .files import delete_file
+from .cache import DiskCache
+from .files import temporary_directory, hash_file
 
-__all__ = ("count",)
+__all__ = ("count", "count_batch", "profile", "parse_profile", "Profile", "FunctionCost")
+
+T = TypeVar("T")
+
+# Bump whenever cached results would no longer be valid
+CACHE_FORMAT = 1
+
+# Digests of executables by path, size and modification time
+_executable_digests: Dict[Tuple[str, int, int, int], str] = {}
 
 
 def read_last_line(path: Path) -> Optional[str]:
@@ -25,33 +39,322 @@ def read_last_line(path: Path) -> Optional[str]:
         return file.readlines()[-1].decode()
 
 
+def _callgrind(
+        args: Tuple[str, ...],
+        stdin: Optional[bytes],
+        timeout: Optional[float],
+        cwd: Optional[Path],
+        extra_valgrind_args: List[str],
+        read: Callable[[Path], Optional[T]]) -> Tuple[process.Runtime, Optional[T]]:
+    """Run the program under callgrind and read the output file."""
+
+    with temporary_directory(prefix="curricula-callgrind-") as directory:
+        out_path = directory.joinpath("callgrind.out")
+        runtime = process.run(
+            "valgrind",
+            "--tool=callgrind",
+            f"--callgrind-out-file={out_path}",
+            *extra_valgrind_args,
+            *args,
+            stdin=stdin,
+            timeout=timeout,
+            cwd=cwd)
+        if out_path.exists():
+            return runtime, read(out_path)
+    return runtime, None
+
+
+def read_count(path: Path) -> Optional[int]:
+    """Get the total IR count from the summary line."""
+
+    last_line = read_last_line(path)
+    if last_line is None:
+        return None
+    return int(last_line.rsplit(maxsplit=1)[1])
+
+
+def _executable_digest(executable: str, cwd: Optional[Path]) -> Optional[str]:
+    """Hash the executable that would be run, if it can be found."""
+
+    if os.sep in executable:
+        path = Path(executable)
+        if not path.is_absolute() and cwd is not None:
+            path = cwd.joinpath(path)
+    else:
+        found = shutil.which(executable)
+        if found is None:
+            return None
+        path = Path(found)
+
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+
+    key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    digest = _executable_digests.get(key)
+    if digest is None:
+        digest = _executable_digests[key] = hash_file(path)
+    return digest
+
+
+def _cache_key(
+        args: Tuple[str, ...],
+        stdin: Optional[bytes],
+        cwd: Optional[Path],
+        extra_valgrind_args: List[str]) -> Optional[str]:
+    """Identify a callgrind run by everything that affects its count."""
+
+    if not args:
+        return None
+    digest = _executable_digest(args[0], cwd)
+    if digest is None:
+        return None
+
+    key = hashlib.sha256()
+    key.update(json.dumps([
+        CACHE_FORMAT,
+        digest,
+        list(args),
+        str(cwd) if cwd is not None else None,
+        extra_valgrind_args]).encode())
+    key.update(b"\0")
+    key.update(stdin or b"")
+    return key.hexdigest()
+
+
 def count(
         *args: str,
         stdin: bytes = None,
         timeout: float = None,
         cwd: Path = None,
-        function_name: str = None) -> Tuple[process.Runtime, Optional[int]]:
-    """Run callgrind on the program and return IR count."""
+        function_name: str = None,
+        cache: DiskCache = None) -> Tuple[process.Runtime, Optional[int]]:
+    """Run callgrind on the program and return IR count.
+
+    If a cache is provided, results are looked up by a hash of the
+    executable's contents, the arguments, stdin, cwd and the toggled
+    function. Only runs that produced a count without timing out are
+    stored.
+    """
 
     extra_valgrind_args = []
     if function_name is not None:
         extra_valgrind_args.append(f"--toggle-collect={function_name}")
 
-    out_path = Path(next(tempfile._get_candidate_names()))
-    runtime = process.run(
-        "valgrind",
-        "--tool=callgrind",
-        f"--callgrind-out-file={out_path.parts[-1]}",
-        *extra_valgrind_args,
-        *args,
-        stdin=stdin,
-        timeout=timeout,
-        cwd=cwd)
-    if out_path.exists():
-        last_line = read_last_line(out_path)
-        if last_line is None:
-            return runtime, None
-        result = int(last_line.rsplit(maxsplit=1)[1])
-        delete_file(out_path)
-        return runtime, result
-    return runtime, None
+    key = None
+    if cache is not None:
+        key = _cache_key(args, stdin, cwd, extra_valgrind_args)
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+    runtime, result = _callgrind(args, stdin, timeout, cwd, extra_valgrind_args, read_count)
+    if key is not None and result is not None and not runtime.timed_out and not runtime.raised_exception:
+        cache.set(key, (runtime, result))
+    return runtime, result
+
+
+@dataclass(eq=False)
+class FunctionCost:
+    """Instruction counts attributed to a single function."""
+
+    name: str
+
+    # Cost of the function's own instructions
+    exclusive: int = 0
+
+    # Cost including everything it called
+    inclusive: int = 0
+
+    # Number of times it was called
+    calls: int = 0
+
+
+@dataclass(eq=False)
+class Profile:
+    """Per-function costs from a single callgrind run.
+
+    Costs are for the first event recorded, which is the instruction
+    count unless callgrind was configured otherwise. The inclusive
+    cost of a function is the cost of all calls made to it by other
+    functions, or its own cost plus its calls if it is never called.
+    Mutually recursive functions are overcounted once per cycle.
+    """
+
+    events: Tuple[str, ...] = ()
+    total: int = 0
+    functions: Dict[str, FunctionCost] = field(default_factory=dict)
+
+    def get(self, name: str) -> Optional[FunctionCost]:
+        """Find a function by exact name."""
+
+        return self.functions.get(name)
+
+    def match(self, pattern: str) -> List[FunctionCost]:
+        """Find all functions matching a wildcard like --toggle-collect."""
+
+        return [cost for name, cost in self.functions.items() if fnmatch.fnmatchcase(name, pattern)]
+
+    def inclusive(self, *patterns: str) -> Dict[str, int]:
+        """Sum the inclusive costs of the functions matching each pattern."""
+
+        return {pattern: sum(cost.inclusive for cost in self.match(pattern)) for pattern in patterns}
+
+    def exclusive(self, *patterns: str) -> Dict[str, int]:
+        """Sum the exclusive costs of the functions matching each pattern."""
+
+        return {pattern: sum(cost.exclusive for cost in self.match(pattern)) for pattern in patterns}
+
+
+def _parse_number(token: str) -> int:
+    """Costs may be written in decimal or hex."""
+
+    if token.startswith("0x"):
+        return int(token, 16)
+    return int(token)
+
+
+def _first_cost(tokens: List[str], positions: int) -> int:
+    """Get the first event's cost from a cost line."""
+
+    if len(tokens) > positions:
+        return _parse_number(tokens[positions])
+    return 0
+
+
+def parse_profile(file: TextIO) -> Profile:
+    """Parse the callgrind output format.
+
+    Handles compressed names like fn=(12) name and fn=(12), relative
+    positions, multiple parts, and calls= records whose following
+    cost line is attributed to the caller's inclusive cost.
+    """
+
+    result = Profile()
+    names = {}
+    positions = 1
+    summaries = 0
+    totals = 0
+
+    function = None
+    callee = None
+    calling = None
+
+    # Call costs between distinct functions
+    incoming = {}
+    outgoing = {}
+
+    def lookup(value: str) -> str:
+        """Resolve compressed names, registering new ones."""
+
+        if not value.startswith("("):
+            return value
+        end = value.index(")")
+        key = value[1:end]
+        name = value[end + 1:].strip()
+        if name:
+            names[key] = name
+        return names[key]
+
+    def cost_of(name: str) -> FunctionCost:
+        cost = result.functions.get(name)
+        if cost is None:
+            cost = result.functions[name] = FunctionCost(name)
+        return cost
+
+    for line in file:
+        line = line.strip()
+        if not line or line[0] == "#":
+            continue
+
+        # Cost lines start with a position
+        if line[0].isdigit() or line[0] in "+-*":
+            cost = _first_cost(line.split(), positions)
+            if calling is not None:
+                if calling is not function:
+                    incoming[calling.name] = incoming.get(calling.name, 0) + cost
+                    outgoing[function.name] = outgoing.get(function.name, 0) + cost
+                calling = None
+            elif function is not None:
+                function.exclusive += cost
+            continue
+
+        key, separator, value = line.partition("=")
+        if separator:
+            if key == "fn":
+                function = cost_of(lookup(value))
+            elif key == "cfn":
+                callee = cost_of(lookup(value))
+            elif key == "calls":
+                calling = callee if callee is not None else function
+                calling.calls += _parse_number(value.split()[0])
+                callee = None
+            continue
+
+        key, separator, value = line.partition(":")
+        if key == "positions":
+            positions = len(value.split())
+        elif key == "events":
+            result.events = tuple(value.split())
+        elif key == "summary":
+            summaries += _parse_number(value.split()[0])
+        elif key == "totals":
+            totals += _parse_number(value.split()[0])
+
+    for name, cost in result.functions.items():
+        if name in incoming:
+            cost.inclusive = incoming[name]
+        else:
+            cost.inclusive = cost.exclusive + outgoing.get(name, 0)
+
+    # Each part of the output has its own summary
+    result.total = summaries or totals
+    return result
+
+
+def read_profile(path: Path) -> Profile:
+    """Parse a callgrind output file."""
+
+    with path.open() as file:
+        return parse_profile(file)
+
+
+def profile(
+        *args: str,
+        stdin: bytes = None,
+        timeout: float = None,
+        cwd: Path = None) -> Tuple[process.Runtime, Optional[Profile]]:
+    """Run callgrind once and return costs for every function.
+
+    This replaces running count once per function of interest, since
+    any number of functions can be queried on the resulting profile.
+    """
+
+    return _callgrind(args, stdin, timeout, cwd, ["--compress-strings=yes"], read_profile)
+
+
+def count_batch(
+        invocations: Iterable[process.Invocation],
+        function_name: str = None,
+        concurrency: int = None,
+        cache: DiskCache = None) -> List[Tuple[process.Runtime, Optional[int]]]:
+    """Count instructions for many invocations at once, preserving order.
+
+    Only the arguments, stdin, timeout and cwd of each invocation are
+    used. If concurrency is None, it defaults to the number of
+    processors.
+    """
+
+    def count_one(invocation: process.Invocation) -> Tuple[process.Runtime, Optional[int]]:
+        return count(
+            *invocation.args,
+            stdin=invocation.stdin,
+            timeout=invocation.timeout,
+            cwd=invocation.cwd,
+            function_name=function_name,
+            cache=cache)
+
+    with ThreadPoolExecutor(max_workers=concurrency or os.cpu_count()) as executor:
+        return list(executor.map(count_one, invocations))
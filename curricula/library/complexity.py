@@ -0,0 +1,163 @@
+import math
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+from . import process, callgrind
+from .cache import DiskCache
+
+__all__ = (
+    "GrowthClass",
+    "GROWTH_CLASSES",
+    "Fit",
+    "ComplexityEstimate",
+    "fit",
+    "estimate")
+
+
+@dataclass(frozen=True)
+class GrowthClass:
+    """A candidate asymptotic class, like n log n."""
+
+    name: str
+    function: Callable[[int], float]
+
+
+GROWTH_CLASSES = (
+    GrowthClass("1", lambda n: 1.0),
+    GrowthClass("log n", lambda n: math.log2(max(n, 1))),
+    GrowthClass("n", lambda n: float(n)),
+    GrowthClass("n log n", lambda n: n * math.log2(max(n, 1))),
+    GrowthClass("n^2", lambda n: float(n) ** 2),
+    GrowthClass("n^3", lambda n: float(n) ** 3),
+    GrowthClass("2^n", lambda n: 2.0 ** n if n < 1000 else math.inf),)
+
+
+@dataclass(eq=False)
+class Fit:
+    """Least squares fit of counts to coefficient * g(n) + intercept."""
+
+    growth: GrowthClass
+    coefficient: float
+    intercept: float
+
+    # Root mean square error relative to the mean count
+    residual: float
+
+    def predict(self, n: int) -> float:
+        """Evaluate the fitted model."""
+
+        return self.coefficient * self.growth.function(n) + self.intercept
+
+
+@dataclass(eq=False)
+class ComplexityEstimate:
+    """Instruction counts per size and the growth class that fits best.
+
+    If any run failed to produce a count, no fits are made and best is
+    None; the runtimes can be used to report why.
+    """
+
+    sizes: List[int]
+    runtimes: List[process.Runtime]
+    counts: List[Optional[int]]
+    fits: List[Fit] = field(default_factory=list)
+    best: Optional[Fit] = None
+
+    # How much better the best fit is than the runner up, from 0 to 1
+    confidence: float = 0.0
+
+
+def _fit_one(growth: GrowthClass, sizes: Sequence[int], counts: Sequence[int]) -> Optional[Fit]:
+    """Fit a single growth class with a non-negative coefficient.
+
+    Classes whose values are too large to fit in floating point, like
+    2^n for a few hundred elements, are skipped by returning None.
+    """
+
+    xs = [growth.function(n) for n in sizes]
+    if not all(math.isfinite(x) for x in xs):
+        return None
+
+    count = len(xs)
+    try:
+        mean_x = sum(xs) / count
+        mean_y = sum(counts) / count
+        variance = sum((x - mean_x) ** 2 for x in xs)
+        coefficient = 0.0
+        if variance > 0:
+            coefficient = max(0.0, sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, counts)) / variance)
+        intercept = mean_y - coefficient * mean_x
+        error = math.sqrt(sum((coefficient * x + intercept - y) ** 2 for x, y in zip(xs, counts)) / count)
+    except OverflowError:
+        return None
+
+    residual = error / mean_y if mean_y > 0 else error
+    if not all(math.isfinite(value) for value in (variance, coefficient, intercept, residual)):
+        return None
+    return Fit(growth=growth, coefficient=coefficient, intercept=intercept, residual=residual)
+
+
+def fit(
+        sizes: Sequence[int],
+        counts: Sequence[int],
+        classes: Iterable[GrowthClass] = GROWTH_CLASSES,
+        tolerance: float = 0.1) -> Tuple[List[Fit], Optional[Fit], float]:
+    """Fit counts against each growth class.
+
+    Classes must be ordered from slowest to fastest growing. A faster
+    growing class only replaces the current best if it reduces the
+    residual by more than the relative tolerance, so measurement noise
+    never promotes a class with a near-zero coefficient. Returns the
+    fits, the best one and a confidence in the choice.
+    """
+
+    if len(sizes) != len(counts) or len(sizes) < 3:
+        raise ValueError("at least three sizes with counts are required to fit growth")
+
+    fits = [result for result in (_fit_one(growth, sizes, counts) for growth in classes) if result is not None]
+    best = fits[0]
+    for result in fits[1:]:
+        if result.residual * (1 + tolerance) < best.residual:
+            best = result
+
+    # Compare against the closest alternative, ignoring degenerate fits
+    # that collapsed to a constant
+    others = [result.residual for result in fits if result is not best and result.coefficient > 0]
+    if not others:
+        return fits, best, 1.0
+    runner_up = min(others)
+    if runner_up <= 0:
+        return fits, best, 0.0
+    return fits, best, max(0.0, 1.0 - best.residual / runner_up)
+
+
+def estimate(
+        generate: Callable[[int], process.Invocation],
+        sizes: Sequence[int],
+        function_name: str = None,
+        classes: Iterable[GrowthClass] = GROWTH_CLASSES,
+        concurrency: int = None,
+        cache: DiskCache = None) -> ComplexityEstimate:
+    """Empirically estimate the complexity of a program.
+
+    The generate callable builds the invocation for a given input
+    size. Instruction counts for every size are collected in parallel
+    with callgrind, optionally restricted to a single function, and
+    fit against each growth class.
+    """
+
+    sizes = list(sizes)
+    results = callgrind.count_batch(
+        map(generate, sizes),
+        function_name=function_name,
+        concurrency=concurrency,
+        cache=cache)
+
+    runtimes = [runtime for runtime, _ in results]
+    counts = [count for _, count in results]
+    result = ComplexityEstimate(sizes=sizes, runtimes=runtimes, counts=counts)
+    if any(count is None for count in counts):
+        return result
+
+    result.fits, result.best, result.confidence = fit(sizes, counts, classes)
+    return result
@@ -1,7 +1,41 @@
 import os
+import stat
+import uuid
+import errno
+import queue
 import shutil
-import distutils.dir_util
+import hashlib
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Iterator, Dict, Set, List, Tuple, Callable, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Memory-backed scratch space, if the system provides it
+SCRATCH_ROOT = Path("/dev/shm")
+
+# Hidden directory next to deleted directories holding them until reaped
+TRASH_NAME = ".curricula-trash"
+
+# Times to retry moving into a trash that another process removed concurrently
+TRASH_ATTEMPTS = 5
+
+# ioctl request to share extents with another file, from linux/fs.h
+FICLONE = 0x40049409
+
+# Ways distribute_file can produce a file, from cheapest to costliest
+DISTRIBUTION_METHODS = ("reflink", "hardlink", "copy_file_range", "sendfile", "copy")
+
+# Errors meaning a method is not available for this pair of files
+_UNSUPPORTED = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EPERM, errno.EBADF}
 
 
 def contains(parent: Path, child: Path) -> bool:
@@ -42,24 +76,384 @@ def copy_file(source: Path, destination: Path):
     shutil.copy(str(source), str(destination))
 
 
-def copy_directory(source: Path, destination: Path, merge: bool = False):
-    """Copy all files recursively."""
-
-    if merge:
-        distutils.dir_util.copy_tree(str(source), str(destination))
+def _copy_range(source: int, destination: int, size: int, function: Callable[[int, int, int], int]):
+    """Loop a kernel copy call until the whole file has been copied."""
+
+    copied = 0
+    while copied < size:
+        count = function(source, destination, size - copied)
+        if count == 0:
+            break
+        copied += count
+
+
+def _sendfile(source: int, destination: int, count: int) -> int:
+    """Send from the current offset of source, as copy_file_range does."""
+
+    return os.sendfile(destination, source, None, count)
+
+
+def _unsupported(error: OSError, methods: Set[str], method: str):
+    """Forget a method that cannot work here, or re-raise a real error."""
+
+    if error.errno not in _UNSUPPORTED:
+        raise error
+    methods.discard(method)
+
+
+def _reflink(source: Path, destination: Path) -> None:
+    """Share the source's extents, removing the destination on failure."""
+
+    try:
+        with open(str(source), "rb") as source_file, open(str(destination), "wb") as destination_file:
+            fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+    except OSError:
+        with suppress(FileNotFoundError):
+            os.unlink(str(destination))
+        raise
+
+
+def distribute_file(source: Path, destination: Path, methods: Set[str] = None) -> str:
+    """Create destination with the contents of source as cheaply as possible.
+
+    Tries a reflink, which shares the underlying extents copy-on-write,
+    then a hardlink if the source is read-only, then in-kernel copies,
+    and finally a regular copy. Any existing destination is unlinked
+    first so that a shared file is never written through. Methods that
+    turn out to be unsupported are removed from the methods set, so a
+    caller distributing many files only pays for each failure once.
+    Returns the method that was used.
+    """
+
+    if methods is None:
+        methods = set(DISTRIBUTION_METHODS)
+
+    source_stat = os.stat(str(source))
+    with suppress(FileNotFoundError):
+        os.unlink(str(destination))
+
+    if "reflink" in methods and fcntl is not None:
+        try:
+            _reflink(source, destination)
+            shutil.copystat(str(source), str(destination))
+            return "reflink"
+        except OSError as error:
+            _unsupported(error, methods, "reflink")
+
+    if "hardlink" in methods and not source_stat.st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH):
+        try:
+            os.link(str(source), str(destination))
+            return "hardlink"
+        except OSError as error:
+            if error.errno != errno.EMLINK:
+                _unsupported(error, methods, "hardlink")
+
+    used = "copy"
+    with open(str(source), "rb") as source_file, open(str(destination), "wb") as destination_file:
+        source_fd = source_file.fileno()
+        destination_fd = destination_file.fileno()
+        for method, function in (("copy_file_range", getattr(os, "copy_file_range", None)), ("sendfile", _sendfile)):
+            if method not in methods or function is None:
+                continue
+            try:
+                _copy_range(source_fd, destination_fd, source_stat.st_size, function)
+                used = method
+                break
+            except OSError as error:
+                _unsupported(error, methods, method)
+                os.lseek(source_fd, 0, os.SEEK_SET)
+                os.ftruncate(destination_fd, 0)
+                os.lseek(destination_fd, 0, os.SEEK_SET)
+        else:
+            shutil.copyfileobj(source_file, destination_file)
+
+    shutil.copystat(str(source), str(destination))
+    return used
+
+
+def distribute_directory(
+        source: Path,
+        destination: Path,
+        merge: bool = False,
+        concurrency: int = None) -> Dict[str, int]:
+    """Populate destination with the files of source as cheaply as possible.
+
+    Meant for setting up many sandboxes from the same tree. The
+    directory structure is created first, then files are produced by
+    distribute_file in parallel. Read-only source files may be
+    hardlinked, in which case they are shared with every other copy,
+    so make writable any file a sandbox is expected to change. Returns
+    how many files each method produced.
+    """
+
+    if not merge and destination.exists():
+        delete(destination)
+
+    directories: List[Tuple[str, Path]] = []
+    files: List[Tuple[Path, Path]] = []
+    for root, _, names in os.walk(str(source), followlinks=True):
+        target = destination.joinpath(relative(source, Path(root)))
+        target.mkdir(parents=True, exist_ok=True)
+        directories.append((root, target))
+        for name in names:
+            files.append((Path(root, name), target.joinpath(name)))
+
+    methods = set(DISTRIBUTION_METHODS)
+    with ThreadPoolExecutor(max_workers=concurrency or os.cpu_count()) as executor:
+        used = Counter(executor.map(lambda pair: distribute_file(*pair, methods=methods), files))
+
+    # Directory times change as files are added, so copy them last
+    for root, target in directories:
+        shutil.copystat(root, str(target))
+    return dict(used)
+
+
+@dataclass(eq=False)
+class SyncReport:
+    """Paths changed by a sync, relative to the destination."""
+
+    created: List[Path] = field(default_factory=list)
+    updated: List[Path] = field(default_factory=list)
+    deleted: List[Path] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.created or self.updated or self.deleted)
+
+
+def _same_file(source: os.DirEntry, destination: os.DirEntry, checksum: bool) -> bool:
+    """Compare by size and modification time, or by contents."""
+
+    source_stat = source.stat()
+    destination_stat = destination.stat()
+    if source_stat.st_size != destination_stat.st_size:
+        return False
+    if checksum:
+        return hash_file(Path(source.path)) == hash_file(Path(destination.path))
+    return source_stat.st_mtime_ns == destination_stat.st_mtime_ns
+
+
+def _sync(source: Path, destination: Path, root: Path, checksum: bool, prune: bool, report: SyncReport):
+    """Recursively sync one directory level."""
+
+    destination.mkdir(parents=True, exist_ok=True)
+    with os.scandir(str(destination)) as iterator:
+        existing = {entry.name: entry for entry in iterator}
+
+    with os.scandir(str(source)) as iterator:
+        entries = list(iterator)
+
+    for entry in entries:
+        target = destination.joinpath(entry.name)
+        current = existing.pop(entry.name, None)
+
+        if entry.is_dir():
+            if current is not None and not current.is_dir():
+                os.unlink(current.path)
+                report.deleted.append(relative(root, target))
+            _sync(Path(entry.path), target, root, checksum, prune, report)
+            continue
+
+        if current is None:
+            report.created.append(relative(root, target))
+        elif current.is_dir():
+            delete_directory(target)
+            report.deleted.append(relative(root, target))
+            report.created.append(relative(root, target))
+        elif _same_file(entry, current, checksum):
+            report.unchanged += 1
+            continue
+        else:
+            # Never write through a hardlink to another tree
+            os.unlink(current.path)
+            report.updated.append(relative(root, target))
+        shutil.copy2(entry.path, str(target))
+
+    if prune:
+        for name, current in existing.items():
+            target = destination.joinpath(name)
+            if current.is_dir() and not current.is_symlink():
+                delete_directory(target)
+            else:
+                os.unlink(current.path)
+            report.deleted.append(relative(root, target))
+
+    shutil.copystat(str(source), str(destination))
+
+
+def sync_directory(source: Path, destination: Path, checksum: bool = False, prune: bool = False) -> SyncReport:
+    """Copy only the files that differ from destination.
+
+    Files are considered unchanged if their size and modification time
+    match, which copying preserves, or if checksum is set, if their
+    contents hash the same. Changed files are replaced rather than
+    written in place. If prune, anything in destination that is not
+    in source is deleted. Returns what changed.
+    """
+
+    report = SyncReport()
+    _sync(source, destination, destination, checksum, prune, report)
+    return report
+
+
+def copy_directory(source: Path, destination: Path, merge: bool = False, distribute: bool = False):
+    """Copy all files recursively.
+
+    If merge, files already in destination are kept and only changed
+    files are copied; see sync_directory. If distribute, files are
+    reflinked, hardlinked when read-only, or copied in kernel where
+    possible; see distribute_directory.
+    """
+
+    if distribute:
+        distribute_directory(source, destination, merge=merge)
+    elif merge:
+        sync_directory(source, destination)
     else:
         if destination.exists():
             delete(destination)
         shutil.copytree(str(source), str(destination))
 
 
-def delete(path: Path):
+def hash_file(path: Path, algorithm: str = "sha256") -> str:
+    """Compute the hex digest of a file's contents."""
+
+    digest = hashlib.new(algorithm)
+    with path.open("rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Reaper:
+    """Deletes directories on a background thread after moving them away.
+
+    A directory is renamed into a trash directory beside it, which is
+    atomic and constant time on the same filesystem, and then removed
+    by a daemon thread running at the lowest CPU and I/O priority.
+    Anything left in a trash directory by an interrupted process is
+    reaped the next time that trash directory is used.
+
+    While deletions are pending, the trash shows up in the parent as
+    a directory named .curricula-trash, which patterns such as
+    Path.glob("*/") will match.
+    """
+
+    def __init__(self):
+        self._queue: "queue.Queue[Path]" = queue.Queue()
+        self._condition = threading.Condition()
+        self._pending = 0
+        self._thread: Optional[threading.Thread] = None
+        self._trashes: Set[Path] = set()
+
+    def _schedule(self, path: Path):
+        """Queue a path, starting the thread if it has exited."""
+
+        with self._condition:
+            self._pending += 1
+            self._queue.put(path)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="curricula-reaper", daemon=True)
+                self._thread.start()
+
+    def trash(self, path: Path) -> bool:
+        """Move a directory to the trash and schedule it for deletion.
+
+        Returns False if it could not be renamed, for example because it
+        is a mount point, in which case nothing was done.
+        """
+
+        trash = path.parent.joinpath(TRASH_NAME)
+        target = trash.joinpath(uuid.uuid4().hex)
+
+        # Hold the lock so the reaper cannot remove the trash in between
+        with self._condition:
+            for attempt in range(TRASH_ATTEMPTS):
+                try:
+                    trash.mkdir(exist_ok=True)
+                    os.rename(str(path), str(target))
+                    break
+                except OSError as error:
+                    # Another process's reaper may remove the trash before the rename
+                    if error.errno == errno.ENOENT and os.path.lexists(str(path)) and attempt + 1 < TRASH_ATTEMPTS:
+                        continue
+                    # Do not leave behind a trash that was only just made
+                    with suppress(OSError):
+                        trash.rmdir()
+                    if error.errno in (errno.EXDEV, errno.EBUSY, errno.EACCES, errno.EPERM, errno.EROFS):
+                        return False
+                    raise
+            leftovers = trash not in self._trashes
+            self._trashes.add(trash)
+        if leftovers:
+            for entry in trash.iterdir():
+                self._schedule(entry)
+        else:
+            self._schedule(target)
+        return True
+
+    def _run(self):
+        """Delete trashed directories until the queue stays empty."""
+
+        with suppress(OSError, AttributeError):
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+
+        while True:
+            try:
+                path = self._queue.get(timeout=1)
+            except queue.Empty:
+                with self._condition:
+                    if self._queue.empty():
+                        self._thread = None
+                        return
+                continue
+
+            if path.is_symlink():
+                with suppress(OSError):
+                    path.unlink()
+            else:
+                shutil.rmtree(str(path), ignore_errors=True)
+            with self._condition:
+                # Remove the trash once empty so it does not linger
+                with suppress(OSError):
+                    path.parent.rmdir()
+                    self._trashes.discard(path.parent)
+                self._pending -= 1
+                self._condition.notify_all()
+
+    @property
+    def pending(self) -> int:
+        """How many directories are waiting to be deleted."""
+
+        return self._pending
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait for every trashed directory to be deleted.
+
+        Returns False if the timeout expired first.
+        """
+
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending == 0, timeout)
+
+
+reaper = Reaper()
+
+
+def flush_trash(timeout: float = None) -> bool:
+    """Wait for directories deleted in the background to be gone."""
+
+    return reaper.flush(timeout)
+
+
+def delete(path: Path, background: bool = False):
     """Delete a file or directory."""
 
     if path.is_file():
         delete_file(path)
     else:
-        delete_directory(path)
+        delete_directory(path, background=background)
 
 
 def delete_file(path: Path):
@@ -68,17 +462,31 @@ def delete_file(path: Path):
     os.remove(str(path))
 
 
-def delete_directory(path: Path):
-    """Delete a directory recursively."""
+def delete_directory(path: Path, background: bool = False):
+    """Delete a directory recursively.
+
+    If background, the directory is moved aside and deleted on the
+    reaper thread, so this returns immediately; see Reaper. Falls
+    back to deleting inline if it cannot be moved. A symbolic link
+    to a directory is unlinked, leaving its target alone.
+    """
 
+    if path.is_symlink():
+        path.unlink()
+        return
+    if background and reaper.trash(path):
+        return
     shutil.rmtree(str(path))
 
 
-def replace_directory(path: Path):
-    """Make sure a directory is present and empty."""
+def replace_directory(path: Path, background: bool = False):
+    """Make sure a directory is present and empty.
+
+    If background, the old contents are deleted by the reaper.
+    """
 
     if path.is_file() or path.is_dir():
-        delete(path)
+        delete(path, background=background)
     path.mkdir(parents=True)
 
 
@@ -92,3 +500,16 @@ def subtract_mode(path: Path, mode: int):
     """Do chmod and subtract a mode."""
 
     os.chmod(str(path), os.stat(str(path)).st_mode & ~mode)
+
+
+@contextmanager
+def temporary_directory(prefix: str = "curricula-") -> Iterator[Path]:
+    """Create a private directory that is deleted afterwards.
+
+    The directory is placed on tmpfs when available so that scratch
+    files written by tools like valgrind never touch the disk.
+    """
+
+    root = SCRATCH_ROOT if SCRATCH_ROOT.is_dir() and os.access(str(SCRATCH_ROOT), os.W_OK | os.X_OK) else None
+    with tempfile.TemporaryDirectory(prefix=prefix, dir=root) as path:
+        yield Path(path)
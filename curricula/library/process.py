@@ -1,14 +1,26 @@
+import asyncio
+import bisect
+import codecs
+import errno
+import os
+import resource
+import select
+import selectors
+import signal
 import subprocess
+import sys
 import timeit
 import time
 
 from ..log import log
 from .debug import get_source_location
+from .serialization import truncate
 
-from typing import Optional, Tuple, Callable, IO, TypeVar, Any
+from typing import Optional, Tuple, Callable, IO, TypeVar, Any, Iterable, List, Union
 from dataclasses import dataclass, asdict, field
-from contextlib import contextmanager
-from functools import lru_cache
+from contextlib import contextmanager, suppress
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
 
 
@@ -38,6 +50,48 @@ class ProcessError:
 
 T = TypeVar("T")
 
+# Recording frames reference stream history without copying
+BytesLike = Union[bytes, memoryview]
+
+
+# Characters of each stream kept when dumping, as serialization.dump would
+STREAM_DUMP_LIMIT = 100_000
+
+
+def decode_stream(
+        data: Optional[BytesLike],
+        limit: int = STREAM_DUMP_LIMIT,
+        errors: str = "replace",
+        append: str = "...") -> Optional[str]:
+    """Decode at most limit characters of a stream's UTF-8 bytes.
+
+    Since a character is at most four bytes, only about four bytes per
+    character are decoded, so a large stream is never decoded in full
+    only to be truncated afterwards. The result is the same as decoding
+    everything and applying serialization.truncate. Invalid bytes are
+    handled by errors; pass "backslashreplace" to keep them visible
+    without losing any. A limit of zero or less decodes everything.
+    """
+
+    if data is None:
+        return None
+    if limit <= 0:
+        return codecs.decode(data, "utf-8", errors)
+
+    # Decode until it is certain whether there are more than limit characters,
+    # which takes more than one pass only if errors drops bytes
+    decoder = codecs.getincrementaldecoder("utf-8")(errors)
+    parts = []
+    length = 0
+    position = 0
+    while length <= limit and position < len(data):
+        end = position + 4 * (limit + 1 - length)
+        part = decoder.decode(data[position:end], final=end >= len(data))
+        parts.append(part)
+        length += len(part)
+        position = end
+    return truncate("".join(parts), limit, append)
+
 
 @lru_cache(maxsize=None)
 def nullable(function: Callable[[Any], T]) -> Callable[[Optional[Any]], Optional[T]]:
@@ -67,18 +121,25 @@ class ProcessCreation:
 class ProcessStreams:
     """Container for streamed data."""
 
-    stdin: Optional[bytes] = None
-    stdout: Optional[bytes] = None
-    stderr: Optional[bytes] = None
+    stdin: Optional[BytesLike] = None
+    stdout: Optional[BytesLike] = None
+    stderr: Optional[BytesLike] = None
 
-    def dump(self) -> dict:
-        """Decode any stream data from bytes."""
+    def dump(self, limit: int = STREAM_DUMP_LIMIT) -> dict:
+        """Decode stream data from bytes, truncating before decoding.
+
+        The full length of each stream in bytes is recorded alongside
+        it so that truncation is visible.
+        """
 
         dump = getattr(super(), "dump", dict)()
         dump.update(
-            stdin=nullable(bytes.decode)(self.stdin),
-            stdout=nullable(bytes.decode)(self.stdout),
-            stderr=nullable(bytes.decode)(self.stderr))
+            stdin=decode_stream(self.stdin, limit),
+            stdout=decode_stream(self.stdout, limit),
+            stderr=decode_stream(self.stderr, limit),
+            stdin_length=nullable(len)(self.stdin),
+            stdout_length=nullable(len)(self.stdout),
+            stderr_length=nullable(len)(self.stderr))
         return dump
 
 
@@ -88,14 +149,192 @@ class Interaction(ProcessStreams, ProcessCreation):
 
     elapsed: Optional[float] = None
 
-    def dump(self) -> dict:
+    def dump(self, limit: int = STREAM_DUMP_LIMIT) -> dict:
         """Make the runtime JSON serializable."""
 
-        dump = super().dump()
+        dump = super().dump(limit)
         dump.update(elapsed=self.elapsed)
         return dump
 
 
+@dataclass(eq=False)
+class Truncation:
+    """Marks where bounded capture dropped bytes from a stream."""
+
+    # Position in the retained data where the gap is
+    offset: int
+
+    # Number of bytes that were discarded
+    dropped: int
+
+    def dump(self) -> dict:
+        """Serialize."""
+
+        return asdict(self)
+
+
+@dataclass(eq=False)
+class ResourceUsage:
+    """Resources consumed by a child process, as reported by wait4."""
+
+    # CPU seconds spent in user and kernel mode
+    user_time: float
+    system_time: float
+
+    # Peak resident set size in kilobytes (bytes on macOS)
+    max_rss: int
+
+    # Context switches from blocking and from preemption
+    voluntary_context_switches: int
+    involuntary_context_switches: int
+
+    @classmethod
+    def from_rusage(cls, usage: resource.struct_rusage) -> "ResourceUsage":
+        """Convert the raw structure."""
+
+        return cls(
+            user_time=usage.ru_utime,
+            system_time=usage.ru_stime,
+            max_rss=usage.ru_maxrss,
+            voluntary_context_switches=usage.ru_nvcsw,
+            involuntary_context_switches=usage.ru_nivcsw)
+
+    def dump(self) -> dict:
+        """Serialize."""
+
+        return asdict(self)
+
+
+# Applies limits given as which:soft:hard,... and execs the rest of argv,
+# restoring the signals Python ignores as Popen's restore_signals does.
+# The report pipe closes on exec, or carries the errno if it fails.
+_LIMITS_SHIM = """\
+import errno, os, resource, signal, sys
+report = int(sys.argv[2])
+os.set_inheritable(report, False)
+try:
+    for name in ("SIGPIPE", "SIGXFZ", "SIGXFSZ"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), signal.SIG_DFL)
+    for specification in sys.argv[1].split(","):
+        which, soft, hard = map(int, specification.split(":"))
+        resource.setrlimit(which, (soft, hard))
+    os.execvp(sys.argv[4], sys.argv[4:])
+except (OSError, ValueError) as error:
+    os.write(report, str(getattr(error, "errno", None) or errno.EPERM).encode())
+    os._exit(127)
+"""
+
+
+def _spawn(args: Tuple[str, ...], cwd: Optional[Path], limits: Optional["Limits"], **options: Any) -> subprocess.Popen:
+    """Start a process leading its own session, applying limits if any.
+
+    The limits helper reports a failed exec through a pipe, so errors
+    like a missing or malformed executable are raised here just as
+    Popen raises them for a plain spawn.
+    """
+
+    cwd = str(cwd) if cwd is not None else None
+    if limits is None or not args or not limits.resources():
+        return subprocess.Popen(args, cwd=cwd, start_new_session=True, **options)
+
+    read, write = os.pipe()
+    try:
+        process = subprocess.Popen(
+            limits.command(args, write),
+            cwd=cwd,
+            start_new_session=True,
+            pass_fds=(write,),
+            **options)
+    except BaseException:
+        os.close(read)
+        raise
+    finally:
+        os.close(write)
+
+    with os.fdopen(read, "rb") as report:
+        try:
+            failure = report.read()
+        except BaseException:
+            _kill(process)
+            raise
+
+    if failure:
+        # Closes the pipes and reaps the helper
+        with process:
+            pass
+        error_number = int(failure)
+        raise OSError(error_number, os.strerror(error_number), args[0])
+    return process
+
+
+@dataclass(eq=False)
+class Limits:
+    """Kernel resource limits applied to a spawned process.
+
+    Limits are set before the executable is started by a small Python
+    shim that the child execs into, which then execs the program and
+    reports back if that fails. Nothing runs in the forked child
+    itself, so limits are safe to use from threads.
+    Exceeding the CPU or file size limit kills the process with a
+    signal that is reported on the runtime. Address space and process
+    limits instead make allocations or forks fail inside the program,
+    so they cannot be attributed reliably. Note that the process limit
+    counts every process owned by the user, not just descendants.
+    """
+
+    # Bytes of virtual memory
+    address_space: Optional[int] = None
+
+    # Seconds of CPU time
+    cpu_time: Optional[int] = None
+
+    # Number of processes for the user
+    processes: Optional[int] = None
+
+    # Bytes in any single file written
+    file_size: Optional[int] = None
+
+    def resources(self) -> List[Tuple[int, Tuple[int, int]]]:
+        """Build the setrlimit arguments ahead of spawning."""
+
+        resources = []
+        if self.address_space is not None:
+            resources.append((resource.RLIMIT_AS, (self.address_space, self.address_space)))
+        if self.cpu_time is not None:
+            # Leave a second between SIGXCPU and SIGKILL
+            resources.append((resource.RLIMIT_CPU, (self.cpu_time, self.cpu_time + 1)))
+        if self.processes is not None:
+            resources.append((resource.RLIMIT_NPROC, (self.processes, self.processes)))
+        if self.file_size is not None:
+            resources.append((resource.RLIMIT_FSIZE, (self.file_size, self.file_size)))
+        return resources
+
+    def command(self, args: Tuple[str, ...], report: int) -> Tuple[str, ...]:
+        """Prefix the arguments with the helper that applies the limits.
+
+        The helper writes the errno to the report file descriptor if
+        the program cannot be executed.
+        """
+
+        specification = ",".join(f"{which}:{soft}:{hard}" for which, (soft, hard) in self.resources())
+        return (sys.executable, "-I", "-S", "-c", _LIMITS_SHIM, specification, str(report), "--", *args)
+
+    def exceeded(self, code: Optional[int], usage: Optional[ResourceUsage]) -> Optional[str]:
+        """Name the limit that killed the process, if any."""
+
+        if code is None or code >= 0:
+            return None
+        if self.cpu_time is not None:
+            if code == -signal.SIGXCPU:
+                return "cpu_time"
+            if code == -signal.SIGKILL and usage is not None and usage.user_time + usage.system_time >= self.cpu_time:
+                return "cpu_time"
+        if self.file_size is not None and code == -signal.SIGXFSZ:
+            return "file_size"
+        return None
+
+
 @dataclass(eq=False)
 class Runtime(ProcessStreams, ProcessCreation):
     """Runtime data extracted from running an external process."""
@@ -114,16 +353,32 @@ class Runtime(ProcessStreams, ProcessCreation):
     raised_exception: bool = False
     exception: Optional[ProcessError] = None
 
-    def dump(self) -> dict:
+    # Bounded capture results, killed if a hard limit was hit
+    stdout_truncation: Optional[Truncation] = None
+    stderr_truncation: Optional[Truncation] = None
+    capture_exceeded: bool = False
+
+    # Collected when the process is reaped
+    usage: Optional[ResourceUsage] = None
+
+    # Name of the Limits field that killed the process
+    limit_exceeded: Optional[str] = None
+
+    def dump(self, limit: int = STREAM_DUMP_LIMIT) -> dict:
         """Make the runtime JSON serializable."""
 
-        dump = super().dump()
+        dump = super().dump(limit)
         dump.update(elapsed=self.elapsed)
         dump.update(code=self.code)
         dump.update(timeout=self.timeout)
         dump.update(timed_out=self.timed_out)
         dump.update(raised_exception=self.raised_exception)
         dump.update(exception=self.exception.dump() if self.exception is not None else None)
+        dump.update(stdout_truncation=nullable(Truncation.dump)(self.stdout_truncation))
+        dump.update(stderr_truncation=nullable(Truncation.dump)(self.stderr_truncation))
+        dump.update(capture_exceeded=self.capture_exceeded)
+        dump.update(usage=nullable(ResourceUsage.dump)(self.usage))
+        dump.update(limit_exceeded=self.limit_exceeded)
         return dump
 
 
@@ -135,6 +390,69 @@ class TimeoutExpired(RuntimeError):
     buffer: bytes
 
 
+class History:
+    """Append-only record of all data passed through a stream.
+
+    Data is stored as a list of immutable chunks so that appending is
+    constant time regardless of how much has been recorded. Reading a
+    range merges the chunks it covers once and returns a memoryview
+    into the merged chunk, so frames over disjoint ranges never copy
+    the same data twice.
+    """
+
+    _chunks: List[bytes]
+    _offsets: List[int]
+    _length: int
+
+    def __init__(self):
+        self._chunks = []
+        self._offsets = []
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __bytes__(self) -> bytes:
+        """Merge everything into a single chunk and return it."""
+
+        if self._length == 0:
+            return b""
+        return self._merge(0, self._length)
+
+    def append(self, data: bytes):
+        """Record more data."""
+
+        if data:
+            self._chunks.append(bytes(data))
+            self._offsets.append(self._length)
+            self._length += len(data)
+
+    def _merge(self, start: int, stop: int) -> bytes:
+        """Join the chunks covering [start, stop) and return the result.
+
+        The merged chunk replaces its parts, which keeps the start of
+        the first covered chunk as a chunk boundary.
+        """
+
+        first = bisect.bisect_right(self._offsets, start) - 1
+        last = bisect.bisect_left(self._offsets, stop) - 1
+        if first != last:
+            self._chunks[first:last + 1] = [b"".join(self._chunks[first:last + 1])]
+            del self._offsets[first + 1:last + 1]
+        return self._chunks[first]
+
+    def view(self, start: int = 0, stop: int = None) -> memoryview:
+        """Get a zero-copy view of a range of recorded data."""
+
+        stop = self._length if stop is None else min(stop, self._length)
+        if start >= stop:
+            return memoryview(b"")
+
+        chunk = self._merge(start, stop)
+        base = self._offsets[bisect.bisect_right(self._offsets, start) - 1]
+        return memoryview(chunk)[start - base:stop - base]
+
+
 @dataclass(eq=False)
 class Stream:
     """Base class for a process stream wrapper."""
@@ -142,38 +460,81 @@ class Stream:
     file: IO[bytes]
 
     # Track all data passed through stream
-    history: bytes = field(init=False, default=b"")
+    history: History = field(init=False, default_factory=History)
 
 
 @dataclass(eq=False)
 class Readable(Stream):
-    """Custom IO stream for Interactive."""
+    """Custom IO stream for Interactive.
+
+    The underlying file descriptor is made non-blocking and watched
+    with a selector, so reads wake up as soon as data arrives or the
+    deadline passes instead of polling.
+    """
+
+    # Maximum bytes requested per read system call
+    CHUNK: int = 65536
+
+    # Set once the writing end has been closed
+    eof: bool = field(init=False, default=False)
+
+    _selector: selectors.BaseSelector = field(init=False, repr=False)
+
+    def __post_init__(self):
+        """Switch the descriptor to non-blocking and register it."""
+
+        os.set_blocking(self.file.fileno(), False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.file.fileno(), selectors.EVENT_READ)
 
-    # Poll rate for reading
-    POLL: float = 0.001
+    def _read_available(self) -> bytes:
+        """Drain whatever the pipe currently holds without blocking."""
+
+        chunks = []
+        while True:
+            try:
+                data = os.read(self.file.fileno(), self.CHUNK)
+            except BlockingIOError:
+                break
+            if not data:
+                self.eof = True
+                break
+            chunks.append(data)
+        return b"".join(chunks)
 
     def _read_block(self, condition: Callable[[bytes], bool] = None, timeout: float = None) -> Optional[bytes]:
-        """Block until something besides None is returned."""
+        """Block until data satisfying the condition has been read.
+
+        If the stream reaches EOF before the condition is satisfied,
+        whatever has been read is returned since no more data can
+        arrive.
+        """
 
-        buffer = b""
+        buffer = bytearray()
 
         timeout_time = None
         if timeout is not None:
             timeout_time = timeit.default_timer() + timeout
 
         while True:
-            data = self.file.read()
-            if data is not None:
-                buffer += data
-                if condition is None or condition(buffer):
-                    break
-            if timeout is not None and timeit.default_timer() >= timeout_time:
-                self.history += buffer
-                raise TimeoutExpired(buffer=buffer)
-            time.sleep(self.POLL)
-
-        self.history += buffer
-        return buffer
+            if not self.eof:
+                data = self._read_available()
+                if data:
+                    self.history.append(data)
+                    buffer += data
+                    if condition is None or condition(buffer):
+                        break
+            if self.eof:
+                break
+
+            remaining = None
+            if timeout_time is not None:
+                remaining = timeout_time - timeit.default_timer()
+                if remaining <= 0:
+                    raise TimeoutExpired(buffer=bytes(buffer))
+            self._selector.select(remaining)
+
+        return bytes(buffer)
 
     def read(
             self,
@@ -181,13 +542,19 @@ class Readable(Stream):
             timeout: float = None) -> Optional[bytes]:
         """Read from a stream.
 
-        If blocking is disabled, may return None. If condition is not
-        None, block until condition is satisfied. If timeout is not
-        None, break after timeout and return buffer or None.
+        If condition is None, return as soon as any data is available.
+        Otherwise block until condition is satisfied. If timeout is
+        not None, raise TimeoutExpired with the partial buffer once it
+        elapses.
         """
 
         return self._read_block(condition=condition, timeout=timeout)
 
+    def close(self):
+        """Release the selector."""
+
+        self._selector.close()
+
 
 @dataclass(eq=False)
 class Writable(Stream):
@@ -203,7 +570,7 @@ class Writable(Stream):
 
         data = sep.join(values) + end
         self.file.write(data)
-        self.history += data
+        self.history.append(data)
         if flush:
             try:
                 self.file.flush()
@@ -211,9 +578,358 @@ class Writable(Stream):
                 pass
 
 
+def _kill(process: subprocess.Popen):
+    """Kill the process along with its whole process group.
+
+    Every process we spawn leads its own session, so its pid is also
+    the id of the group containing any descendants it forks.
+    """
+
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        process.kill()
+
+
+def _group_alive(pgid: int) -> bool:
+    """Check whether a process group has any members left.
+
+    Killed descendants linger as zombies until whoever inherited them
+    reaps them, which a container's init may never do, so members in
+    the zombie state are ignored when /proc is available.
+    """
+
+    try:
+        os.killpg(pgid, 0)
+    except (ProcessLookupError, PermissionError):
+        return False
+
+    proc = Path("/proc")
+    if not proc.is_dir():
+        return True
+    for path in proc.iterdir():
+        if not path.name.isdigit():
+            continue
+        try:
+            stat = path.joinpath("stat").read_bytes()
+        except OSError:
+            continue
+
+        # The command name may contain anything, so split after it
+        state, _, group = stat[stat.rindex(b")") + 2:].split(maxsplit=3)[:3]
+        if int(group) == pgid and state not in (b"Z", b"X"):
+            return True
+    return False
+
+
+def _reap_group(pgid: int, timeout: float = 1.0):
+    """Kill what is left of a process group and confirm it is empty.
+
+    Descendants that started their own session have left the group
+    and cannot be found this way.
+    """
+
+    deadline = timeit.default_timer() + timeout
+    delay = 0.0005
+    while _group_alive(pgid):
+        try:
+            os.killpg(pgid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            return
+        if timeit.default_timer() >= deadline:
+            log.warning(f"processes in group {pgid} survived SIGKILL for {timeout} seconds")
+            return
+        time.sleep(delay)
+        delay = min(delay * 2, 0.05)
+
+
+def _wait_exit(process: subprocess.Popen, timeout: float = None) -> bool:
+    """Wait for the process to exit without reaping it.
+
+    Returns False if the process was already reaped elsewhere. Sleeps
+    on a pidfd where the platform supports it and falls back to
+    backoff polling otherwise.
+    """
+
+    flags = os.WEXITED | os.WNOWAIT
+    try:
+        if timeout is None:
+            os.waitid(os.P_PID, process.pid, flags)
+            return True
+        if os.waitid(os.P_PID, process.pid, flags | os.WNOHANG) is not None:
+            return True
+    except ChildProcessError:
+        return False
+
+    try:
+        pidfd = os.pidfd_open(process.pid)
+    except (AttributeError, OSError):
+        pidfd = None
+
+    deadline = timeit.default_timer() + timeout
+    delay = 0.0005
+    try:
+        while True:
+            remaining = deadline - timeit.default_timer()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(process.args, timeout)
+            if pidfd is not None:
+                select.select((pidfd,), (), (), remaining)
+            else:
+                delay = min(delay * 2, remaining, 0.05)
+                time.sleep(delay)
+            try:
+                if os.waitid(os.P_PID, process.pid, flags | os.WNOHANG) is not None:
+                    return True
+            except ChildProcessError:
+                return False
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
+
+
+def _wait_reap(process: subprocess.Popen, timeout: float = None) -> Optional[tuple]:
+    """Reap the process with wait4, polling with backoff until the timeout.
+
+    Used where os.waitid is unavailable, such as macOS, so there is no
+    way to wait without reaping. Returns the status and usage, or None
+    if the process was already reaped elsewhere.
+    """
+
+    try:
+        if timeout is None:
+            pid, status, usage = os.wait4(process.pid, 0)
+            return status, usage
+
+        deadline = timeit.default_timer() + timeout
+        delay = 0.0005
+        while True:
+            pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+            if pid != 0:
+                return status, usage
+            remaining = deadline - timeit.default_timer()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(process.args, timeout)
+            delay = min(delay * 2, remaining, 0.05)
+            time.sleep(delay)
+    except ChildProcessError:
+        return None
+
+
+def _wait(process: subprocess.Popen, timeout: float = None) -> Optional[ResourceUsage]:
+    """Like Popen.wait, but reap with wait4 to collect resource usage.
+
+    Once the process has exited, but before it is reaped, the rest of
+    its process group is killed; the unreaped leader keeps the group
+    id from being reused. Without os.waitid the leader is reaped first
+    and the group is only cleaned up afterwards. Returns None if the
+    process was already reaped elsewhere.
+    """
+
+    if process.returncode is not None:
+        return None
+
+    if not hasattr(os, "waitid"):
+        reaped = _wait_reap(process, timeout)
+        if reaped is None:
+            process.poll()
+            return None
+        status, usage = reaped
+        process.returncode = os.waitstatus_to_exitcode(status)
+        _reap_group(process.pid)
+        return ResourceUsage.from_rusage(usage)
+
+    if not _wait_exit(process, timeout):
+        process.poll()
+        return None
+
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+    pid, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    _reap_group(process.pid)
+    return ResourceUsage.from_rusage(usage)
+
+
+@dataclass(eq=False)
+class Capture:
+    """Per-stream limits on how much process output is kept in memory.
+
+    The first head bytes and last tail bytes of each stream are
+    retained and everything in between is only counted. If a stream
+    produces more than limit bytes in total, it is no longer read and
+    the process is killed.
+    """
+
+    head: int = 65536
+    tail: int = 65536
+    limit: Optional[int] = None
+
+
+class CaptureBuffer:
+    """Collects a stream, optionally bounded by a Capture."""
+
+    capture: Optional[Capture]
+    total: int
+
+    def __init__(self, capture: Capture = None):
+        self.capture = capture
+        self.total = 0
+        self._chunks = []
+        self._head = bytearray()
+        self._tail = bytearray()
+
+    @property
+    def exceeded(self) -> bool:
+        """Whether the hard limit has been passed."""
+
+        return self.capture is not None and self.capture.limit is not None and self.total > self.capture.limit
+
+    def feed(self, data: BytesLike):
+        """Add data read from the stream."""
+
+        self.total += len(data)
+        if self.capture is None:
+            self._chunks.append(bytes(data))
+            return
+
+        missing = self.capture.head - len(self._head)
+        if missing > 0:
+            self._head += data[:missing]
+            data = data[missing:]
+        if self.capture.tail > 0 and len(data) > 0:
+            self._tail += data[-self.capture.tail:]
+
+            # Trim lazily so that small writes stay amortized constant
+            if len(self._tail) >= 2 * self.capture.tail:
+                del self._tail[:len(self._tail) - self.capture.tail]
+
+    def retained(self) -> bytes:
+        """Everything that was kept, with the gap removed."""
+
+        if self.capture is None:
+            return b"".join(self._chunks)
+        if len(self._tail) > self.capture.tail:
+            del self._tail[:len(self._tail) - self.capture.tail]
+        return bytes(self._head + self._tail)
+
+    def truncation(self) -> Optional[Truncation]:
+        """Describe the gap, if any bytes were dropped."""
+
+        if self.capture is None:
+            return None
+        dropped = self.total - len(self._head) - min(len(self._tail), self.capture.tail)
+        if dropped == 0:
+            return None
+        return Truncation(offset=len(self._head), dropped=dropped)
+
+
+class _Communication:
+    """Drives the pipes of a process in place of Popen.communicate.
+
+    Output is fed into capture buffers as it arrives instead of being
+    accumulated in full, which is what lets output be bounded.
+    """
+
+    exceeded: bool
+
+    def __init__(self, process: subprocess.Popen, stdin: Optional[bytes], stdout: CaptureBuffer, stderr: CaptureBuffer):
+        self.exceeded = False
+        self._selector = selectors.DefaultSelector()
+        self._input = memoryview(stdin or b"")
+        self._offset = 0
+
+        if process.stdin is not None and not process.stdin.closed:
+            if len(self._input) > 0:
+                self._selector.register(process.stdin, selectors.EVENT_WRITE)
+            else:
+                self._close(process.stdin)
+        for file, buffer in ((process.stdout, stdout), (process.stderr, stderr)):
+            if file is not None and not file.closed:
+                self._selector.register(file, selectors.EVENT_READ, buffer)
+
+    @staticmethod
+    def _close(file: IO[bytes]):
+        """Close a pipe, ignoring a reader that has gone away."""
+
+        try:
+            file.close()
+        except BrokenPipeError:
+            pass
+
+    def _finish(self, file: IO[bytes]):
+        """Stop watching a pipe and close it."""
+
+        self._selector.unregister(file)
+        self._close(file)
+
+    def _write(self, file: IO[bytes]):
+        """Write the next atomic chunk of input."""
+
+        try:
+            self._offset += os.write(file.fileno(), self._input[self._offset:self._offset + select.PIPE_BUF])
+        except BrokenPipeError:
+            self._finish(file)
+            return
+        if self._offset >= len(self._input):
+            self._finish(file)
+
+    def _read(self, file: IO[bytes], buffer: CaptureBuffer):
+        """Read whatever is ready into the buffer."""
+
+        try:
+            data = os.read(file.fileno(), 32768)
+        except BlockingIOError:
+            return
+        if not data:
+            self._finish(file)
+            return
+        buffer.feed(data)
+        if buffer.exceeded:
+            self.exceeded = True
+            self._finish(file)
+
+    def run(self, deadline: float = None) -> bool:
+        """Pump until every pipe closes, returning False on deadline.
+
+        Also returns early if a capture limit is exceeded, in which
+        case the caller should kill the process.
+        """
+
+        while self._selector.get_map():
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - timeit.default_timer()
+                if remaining <= 0:
+                    return False
+            for key, events in self._selector.select(remaining):
+                if key.data is None:
+                    self._write(key.fileobj)
+                else:
+                    self._read(key.fileobj, key.data)
+                if self.exceeded:
+                    return True
+        return True
+
+    def close(self):
+        """Close any pipes that are still open."""
+
+        for key in list(self._selector.get_map().values()):
+            self._finish(key.fileobj)
+        self._selector.close()
+
+
 @dataclass(eq=False)
 class Interactive:
-    """An interactive runtime session."""
+    """An interactive runtime session.
+
+    The process leads its own session, so it does not receive the
+    terminal's interrupts. Use the session as a context manager to
+    kill it if anything goes wrong before it is closed.
+    """
 
     _args: Tuple[str, ...]
     _process: subprocess.Popen
@@ -223,28 +939,62 @@ class Interactive:
     stdout: Readable
     stderr: Readable
 
+    limits: Optional[Limits]
+
     _recording: Optional[Interaction] = None
+    _usage: Optional[ResourceUsage] = None
 
-    def __init__(self, args: Tuple[str, ...], cwd: Path = None):
+    def __init__(self, args: Tuple[str, ...], cwd: Path = None, limits: Limits = None):
         """Start up the new process."""
 
         self._args = args
-        self._process = subprocess.Popen(
-            args=args,
+        self._process = _spawn(
+            args,
+            cwd,
+            limits,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            cwd=str(cwd) if cwd is not None else None)
+            stdin=subprocess.PIPE)
         self.cwd = cwd
+        self.limits = limits
         self.stdin = Writable(self._process.stdin)
         self.stdout = Readable(self._process.stdout)
         self.stderr = Readable(self._process.stderr)
         self._start_time = timeit.default_timer()
 
+    def __enter__(self) -> "Interactive":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.kill()
+
+    def kill(self):
+        """Kill the process group if it is still running and release its pipes."""
+
+        if self._process.returncode is None:
+            _kill(self._process)
+        for pipe in (self._process.stdin, self._process.stdout, self._process.stderr):
+            with suppress(OSError):
+                pipe.close()
+        self.stdout.close()
+        self.stderr.close()
+        with suppress(subprocess.TimeoutExpired):
+            self._reap(timeout=1)
+
+    def _reap(self, timeout: float = None):
+        """Wait for exit, keeping the resource usage if we reap it."""
+
+        if self._process.returncode is None:
+            self._usage = _wait(self._process, timeout=timeout)
+
     def poll(self) -> bool:
         """Check whether the interactive has terminated."""
 
-        return self._process.poll() is None
+        try:
+            self._reap(timeout=0)
+        except subprocess.TimeoutExpired:
+            pass
+        return self._process.returncode is None
 
     @contextmanager
     def recording(self) -> Interaction:
@@ -263,26 +1013,60 @@ class Interactive:
 
         # Collect everything that changed
         partial.elapsed = timeit.default_timer() - start_time
-        partial.stdin = self.stdin.history[stdin_index:]
-        partial.stdout = self.stdout.history[stdout_index:]
-        partial.stderr = self.stderr.history[stderr_index:]
+        partial.stdin = self.stdin.history.view(stdin_index)
+        partial.stdout = self.stdout.history.view(stdout_index)
+        partial.stderr = self.stderr.history.view(stderr_index)
+
+    def close(self, timeout: float = None, capture: Capture = None) -> Runtime:
+        """Block until exit, killing the process group on timeout.
 
-    def close(self, timeout: float = None) -> Runtime:
-        """Block until exit."""
+        If capture is provided, it bounds the stdout and stderr stored
+        in the returned runtime, including output already read.
+        """
 
         raised_exception = False
         exception = None
         timed_out = False
-        stdout = b""
-        stderr = b""
+
+        stdout = CaptureBuffer(capture)
+        stdout.feed(self.stdout.history.view())
+        stderr = CaptureBuffer(capture)
+        stderr.feed(self.stderr.history.view())
+
+        self.stdout.close()
+        self.stderr.close()
+        communication = _Communication(self._process, None, stdout, stderr)
+        deadline = timeit.default_timer() + timeout if timeout is not None else None
 
         try:
-            stdout, stderr = self._process.communicate(timeout=timeout)
+            if not communication.run(deadline):
+                timed_out = True
+            elif not communication.exceeded:
+                remaining = deadline - timeit.default_timer() if deadline is not None else None
+                self._reap(timeout=remaining)
         except subprocess.TimeoutExpired:
             timed_out = True
         except OSError as error:
             raised_exception = True
             exception = ProcessError.from_os_error(error)
+        except BaseException:
+            communication.close()
+            self.kill()
+            raise
+
+        # Don't leave anything from the session running
+        if timed_out or communication.exceeded:
+            _kill(self._process)
+            communication.run(timeit.default_timer() + 1)
+            try:
+                self._reap(timeout=1)
+            except subprocess.TimeoutExpired:
+                pass
+        communication.close()
+
+        limit_exceeded = None
+        if self.limits is not None:
+            limit_exceeded = self.limits.exceeded(self._process.returncode, self._usage)
 
         stop_time = timeit.default_timer()
         return Runtime(
@@ -291,43 +1075,61 @@ class Interactive:
             timeout=timeout,
             code=self._process.returncode,
             elapsed=stop_time - self._start_time,
-            stdin=self.stdin.history,
-            stdout=self.stdout.history + stdout,
-            stderr=self.stderr.history + stderr,
+            stdin=bytes(self.stdin.history),
+            stdout=stdout.retained(),
+            stderr=stderr.retained(),
             raised_exception=raised_exception,
             exception=exception,
-            timed_out=timed_out)
-
-
-def run(*args: str, stdin: bytes = None, timeout: float = None, cwd: Path = None) -> Runtime:
+            timed_out=timed_out,
+            stdout_truncation=stdout.truncation(),
+            stderr_truncation=stderr.truncation(),
+            capture_exceeded=communication.exceeded,
+            usage=self._usage,
+            limit_exceeded=limit_exceeded)
+
+
+def run(
+        *args: str,
+        stdin: bytes = None,
+        timeout: float = None,
+        cwd: Path = None,
+        capture: Capture = None,
+        limits: Limits = None) -> Runtime:
     """Run an executable with a list of command line arguments.
 
     The provided path must be absolute in order to properly execute
     the program. Args provided are passed as they would be from the
     command line. The timeout is measured in seconds.
 
-    The process_setup callable is invoked within the spawned process
-    prior to the execution of the command.
+    If capture is provided, only the head and tail of stdout and
+    stderr are kept, and the process is killed if either exceeds the
+    capture's hard limit. If limits are provided, they are applied
+    to the process before it starts.
     """
 
     if timeout is None:
         log.warning(f"process.run has been invoked without a timeout from {get_source_location(2)}")
+    return _run(*args, stdin=stdin, timeout=timeout, cwd=cwd, capture=capture, limits=limits)
+
+
+def _run(
+        *args: str,
+        stdin: bytes = None,
+        timeout: float = None,
+        cwd: Path = None,
+        capture: Capture = None,
+        limits: Limits = None) -> Runtime:
+    """Spawn and wait for the process without checking arguments."""
 
     # Spawn the process, access stdout and stderr
     try:
-        if stdin is not None:
-            process = subprocess.Popen(
-                args,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                stdin=subprocess.PIPE,
-                cwd=str(cwd) if cwd is not None else None)
-        else:
-            process = subprocess.Popen(
-                args,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                cwd=str(cwd) if cwd is not None else None)
+        process = _spawn(
+            args,
+            cwd,
+            limits,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            stdin=subprocess.PIPE if stdin is not None else None)
 
     # Catch common errors
     except OSError as error:
@@ -342,18 +1144,53 @@ def run(*args: str, stdin: bytes = None, timeout: float = None, cwd: Path = None
 
     # Wait for the process to finish with timeout
     start = timeit.default_timer()
+    stdout = CaptureBuffer(capture)
+    stderr = CaptureBuffer(capture)
+    communication = _Communication(process, stdin, stdout, stderr)
+    deadline = start + timeout if timeout is not None else None
+    usage = None
     try:
-        stdout, stderr = process.communicate(input=stdin, timeout=timeout)
+        if not communication.run(deadline):
+            raise subprocess.TimeoutExpired(args, timeout)
+        if not communication.exceeded:
+            usage = _wait(process, timeout=deadline - timeit.default_timer() if deadline is not None else None)
     except subprocess.TimeoutExpired:
-        process.kill()
+        _kill(process)
 
         # Recover data
+        communication.run(timeit.default_timer() + 1)
+        communication.close()
         try:
-            stdout, stderr = process.communicate(timeout=1)
+            usage = _wait(process, timeout=1)
         except subprocess.TimeoutExpired:
-            stdout, stderr = None, None
+            pass
 
-        return Runtime(args=args, cwd=cwd, timeout=timeout, stdin=stdin, stdout=stdout, stderr=stderr, timed_out=True)
+        return Runtime(
+            args=args,
+            cwd=cwd,
+            timeout=timeout,
+            stdin=stdin,
+            stdout=stdout.retained(),
+            stderr=stderr.retained(),
+            timed_out=True,
+            stdout_truncation=stdout.truncation(),
+            stderr_truncation=stderr.truncation(),
+            usage=usage)
+
+    # The child is outside the terminal's process group, so interrupts must be passed on
+    except BaseException:
+        _kill(process)
+        communication.close()
+        with suppress(subprocess.TimeoutExpired):
+            _wait(process, timeout=1)
+        raise
+
+    # Stop the process if it produced too much output
+    if communication.exceeded:
+        _kill(process)
+        communication.run(timeit.default_timer() + 1)
+        usage = _wait(process)
+    communication.close()
 
     # Check elapsed
     elapsed = timeit.default_timer() - start
@@ -364,11 +1201,100 @@ def run(*args: str, stdin: bytes = None, timeout: float = None, cwd: Path = None
         code=process.returncode,
         elapsed=elapsed,
         stdin=stdin,
-        stdout=stdout,
-        stderr=stderr)
+        stdout=stdout.retained(),
+        stderr=stderr.retained(),
+        stdout_truncation=stdout.truncation(),
+        stderr_truncation=stderr.truncation(),
+        capture_exceeded=communication.exceeded,
+        usage=usage,
+        limit_exceeded=limits.exceeded(process.returncode, usage) if limits is not None else None)
+
+
+async def run_async(
+        *args: str,
+        stdin: bytes = None,
+        timeout: float = None,
+        cwd: Path = None,
+        capture: Capture = None,
+        limits: Limits = None,
+        executor: Executor = None) -> Runtime:
+    """Run an executable without blocking the event loop.
+
+    The process is spawned and waited on by a worker thread so that
+    the result is identical to that of run, including timeouts and
+    error handling. If no executor is provided, the event loop's
+    default executor is used.
+    """
+
+    if timeout is None:
+        log.warning(f"process.run_async has been invoked without a timeout from {get_source_location(2)}")
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor,
+        partial(_run, *args, stdin=stdin, timeout=timeout, cwd=cwd, capture=capture, limits=limits))
+
+
+@dataclass(eq=False)
+class Invocation:
+    """Everything needed to run a single process in a batch."""
+
+    args: Tuple[str, ...]
+    stdin: Optional[bytes] = None
+    timeout: Optional[float] = None
+    cwd: Optional[Path] = None
+    capture: Optional[Capture] = None
+    limits: Optional[Limits] = None
+
+    def run(self) -> Runtime:
+        """Run the invocation in the current thread."""
+
+        return _run(
+            *self.args,
+            stdin=self.stdin,
+            timeout=self.timeout,
+            cwd=self.cwd,
+            capture=self.capture,
+            limits=self.limits)
+
+
+def _warn_batch_timeouts(invocations: List[Invocation], name: str, stack_level: int):
+    """Emit a single warning if any invocation is missing a timeout."""
+
+    missing = sum(invocation.timeout is None for invocation in invocations)
+    if missing > 0:
+        log.warning(
+            f"process.{name} has been invoked with {missing} invocation(s) without a timeout "
+            f"from {get_source_location(stack_level + 1)}")
+
+
+def run_batch(invocations: Iterable[Invocation], concurrency: int = None) -> List[Runtime]:
+    """Run many processes with at most concurrency alive at once.
+
+    Runtimes are returned in the same order as the invocations. If
+    concurrency is None, it defaults to the number of processors.
+    """
+
+    invocations = list(invocations)
+    _warn_batch_timeouts(invocations, "run_batch", 2)
+    with ThreadPoolExecutor(max_workers=concurrency or os.cpu_count()) as executor:
+        return list(executor.map(Invocation.run, invocations))
+
+
+async def run_batch_async(invocations: Iterable[Invocation], concurrency: int = None) -> List[Runtime]:
+    """Asynchronous counterpart of run_batch."""
+
+    invocations = list(invocations)
+    _warn_batch_timeouts(invocations, "run_batch_async", 2)
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency or os.cpu_count())
+    try:
+        futures = [loop.run_in_executor(executor, invocation.run) for invocation in invocations]
+        return list(await asyncio.gather(*futures))
+    finally:
+        executor.shutdown(wait=False)
 
 
-def interact(*args: str) -> Interactive:
+def interact(*args: str, limits: Limits = None) -> Interactive:
     """Shorthand for interactive, makes the interface nicer."""
 
-    return Interactive(args=args)
+    return Interactive(args=args, limits=limits)
@@ -0,0 +1,190 @@
+import sqlite3
+from dataclasses import dataclass, fields
+from operator import attrgetter
+from pathlib import Path
+from typing import Optional, Iterable, List, Dict, Any, Union
+
+from .process import Runtime
+from .valgrind import ValgrindReport
+
+__all__ = ("Result", "ResultStore")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    submission TEXT NOT NULL,
+    problem TEXT NOT NULL,
+    test TEXT NOT NULL,
+    passed INTEGER,
+    code INTEGER,
+    timed_out INTEGER NOT NULL DEFAULT 0,
+    elapsed REAL,
+    leaked_blocks INTEGER,
+    leaked_bytes INTEGER,
+    PRIMARY KEY (submission, problem, test)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_by_test ON results (problem, test);
+"""
+
+
+@dataclass(eq=False)
+class Result:
+    """The outcome of a single test on a single submission."""
+
+    submission: str
+    problem: str
+    test: str
+
+    passed: Optional[bool] = None
+    code: Optional[int] = None
+    timed_out: bool = False
+    elapsed: Optional[float] = None
+
+    # Only set if the test ran under memcheck
+    leaked_blocks: Optional[int] = None
+    leaked_bytes: Optional[int] = None
+
+    @classmethod
+    def from_runtime(
+            cls,
+            submission: str,
+            problem: str,
+            test: str,
+            runtime: Runtime,
+            passed: bool = None,
+            report: ValgrindReport = None) -> "Result":
+        """Extract the stored columns from a runtime and optional memcheck report."""
+
+        return cls(
+            submission=submission,
+            problem=problem,
+            test=test,
+            passed=passed,
+            code=runtime.code,
+            timed_out=runtime.timed_out,
+            elapsed=runtime.elapsed,
+            leaked_blocks=report.leaked_blocks if report is not None else None,
+            leaked_bytes=report.leaked_bytes if report is not None else None)
+
+    @classmethod
+    def from_dump(cls, submission: str, problem: str, test: str, data: dict, passed: bool = None) -> "Result":
+        """Extract the stored columns from a serialized runtime or memcheck report."""
+
+        runtime = data.get("runtime", data)
+        return cls(
+            submission=submission,
+            problem=problem,
+            test=test,
+            passed=passed,
+            code=runtime.get("code"),
+            timed_out=runtime.get("timed_out", False),
+            elapsed=runtime.get("elapsed"),
+            leaked_blocks=data.get("leaked_blocks"),
+            leaked_bytes=data.get("leaked_bytes"))
+
+
+COLUMNS = tuple(result_field.name for result_field in fields(Result))
+
+# Shallow, unlike dataclasses.astuple which deep copies every value
+_row = attrgetter(*COLUMNS)
+
+
+class ResultStore:
+    """Indexed store of test results backed by sqlite.
+
+    Results are keyed by submission, problem and test, so storing a
+    result again, for example after a regrade, replaces it. Bulk
+    inserts happen in a single transaction. The database may be
+    ":memory:" for one-off analysis.
+    """
+
+    connection: sqlite3.Connection
+
+    def __init__(self, path: Union[Path, str]):
+        self.connection = sqlite3.connect(str(path))
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def insert(self, results: Iterable[Result]) -> int:
+        """Store many results at once, returning how many were written."""
+
+        placeholders = ", ".join("?" * len(COLUMNS))
+        with self.connection:
+            cursor = self.connection.executemany(
+                f"INSERT OR REPLACE INTO results ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+                map(_row, results))
+        return cursor.rowcount
+
+    def query(self, sql: str, parameters: Iterable[Any] = ()) -> List[tuple]:
+        """Run arbitrary SQL against the results table."""
+
+        return self.connection.execute(sql, tuple(parameters)).fetchall()
+
+    def results(self, **where: Any) -> List[Result]:
+        """Find results whose columns equal the given values."""
+
+        for name in where:
+            if name not in COLUMNS:
+                raise ValueError(f"no result column {name}")
+
+        sql = f"SELECT {', '.join(COLUMNS)} FROM results"
+        if where:
+            sql += " WHERE " + " AND ".join(f"{name} IS ?" for name in where)
+        sql += " ORDER BY submission, problem, test"
+        return [self._result(row) for row in self.query(sql, where.values())]
+
+    def timed_out(self, problem: str = None, test: str = None) -> List[str]:
+        """Submissions that timed out, optionally on a specific test."""
+
+        sql = "SELECT DISTINCT submission FROM results WHERE timed_out"
+        parameters = []
+        if problem is not None:
+            sql += " AND problem = ?"
+            parameters.append(problem)
+        if test is not None:
+            sql += " AND test = ?"
+            parameters.append(test)
+        return [submission for submission, in self.query(sql + " ORDER BY submission", parameters)]
+
+    def failed(self, problem: str, test: str = None) -> List[str]:
+        """Submissions that did not pass a problem or one of its tests."""
+
+        sql = "SELECT DISTINCT submission FROM results WHERE problem = ? AND NOT passed"
+        parameters = [problem]
+        if test is not None:
+            sql += " AND test = ?"
+            parameters.append(test)
+        return [submission for submission, in self.query(sql + " ORDER BY submission", parameters)]
+
+    def average_elapsed(self) -> Dict[str, float]:
+        """Mean elapsed time of every problem's tests, ignoring timeouts."""
+
+        return dict(self.query(
+            "SELECT problem, AVG(elapsed) FROM results "
+            "WHERE NOT timed_out AND elapsed IS NOT NULL GROUP BY problem ORDER BY problem"))
+
+    def leak_totals(self) -> Dict[str, tuple]:
+        """Total leaked blocks and bytes of each submission."""
+
+        return {submission: (blocks, size) for submission, blocks, size in self.query(
+            "SELECT submission, SUM(leaked_blocks), SUM(leaked_bytes) FROM results "
+            "WHERE leaked_blocks IS NOT NULL GROUP BY submission ORDER BY submission")}
+
+    @staticmethod
+    def _result(row: tuple) -> Result:
+        result = Result(*row)
+        if result.passed is not None:
+            result.passed = bool(result.passed)
+        result.timed_out = bool(result.timed_out)
+        return result
+
+    def close(self):
+        """Close the database connection."""
+
+        self.connection.close()
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,5 +1,15 @@
+import gzip
 import json
-from typing import Any, TextIO
+import lzma
+import math
+import struct
+from functools import partial
+from typing import Any, TextIO, BinaryIO, Dict, Optional, Union, Iterator, Iterable, List, Tuple, Callable
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 def truncate(string: str, length: int, append: str = "...") -> str:
@@ -28,15 +38,398 @@ def descend_and_truncate(o: Any, length: int, append: str = "..."):
     return o
 
 
+def truncated(o: Any, length: int, append: str = "..."):
+    """Like descend_and_truncate, but copies instead of mutating.
+
+    Containers are only copied if something inside them was actually
+    truncated, so records without long strings are not duplicated.
+    """
+
+    if isinstance(o, str):
+        return truncate(o, length, append)
+    if isinstance(o, dict):
+        result = o
+        for key, value in o.items():
+            new = truncated(value, length, append)
+            if new is not value:
+                if result is o:
+                    result = dict(o)
+                result[key] = new
+        return result
+    if isinstance(o, list):
+        result = o
+        for i, item in enumerate(o):
+            new = truncated(item, length, append)
+            if new is not item:
+                if result is o:
+                    result = list(o)
+                result[i] = new
+        return result
+    return o
+
+
+class Backend:
+    """Encodes and decodes JSON with the standard library."""
+
+    name = "json"
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        """Decode a document."""
+
+        return json.loads(data)
+
+    def dumps(self, o: Any, **options) -> str:
+        """Encode a document, accepting the options of json.dumps."""
+
+        return json.dumps(o, **options)
+
+
+def _has_non_finite(o: Any) -> bool:
+    """Check for NaN and infinity, which orjson would write as null.
+
+    Most values are plain strings, integers or None, so those are
+    skipped inline by exact type rather than with a call each; anything
+    else, including subclasses, goes through the isinstance checks.
+    """
+
+    if isinstance(o, float):
+        return not math.isfinite(o)
+    if isinstance(o, dict):
+        items = o.values()
+    elif isinstance(o, (list, tuple)):
+        items = o
+    else:
+        return False
+
+    for item in items:
+        cls = type(item)
+        if cls is str or cls is int or item is None or cls is bool:
+            continue
+        if cls is float:
+            if not math.isfinite(item):
+                return True
+        elif _has_non_finite(item):
+            return True
+    return False
+
+
+class OrjsonBackend(Backend):
+    """Uses orjson where it can represent the same data as json.
+
+    Output is compact, without spaces after separators, so it differs
+    byte for byte from json's. orjson only supports two space
+    indentation and no other options, writes NaN and infinity as null,
+    and rejects some values the standard library accepts, such as
+    integers wider than 64 bits; those cases fall back to json. For
+    the same reason, documents orjson cannot parse, like ones with
+    NaN written by json, are decoded with json, as are documents that
+    may hold integers too wide for orjson to read exactly.
+    """
+
+    name = "orjson"
+
+    # Every digit maps to 0 and everything else to a space, so that a run
+    # of digits long enough to overflow 64 bits, possibly in a string, is
+    # found with a plain substring search, which is much faster than a regex
+    DIGITS = bytes(ord("0") if ord("0") <= i <= ord("9") else ord(" ") for i in range(256))
+    WIDE_INTEGER = b"0" * 19
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        """Decode a document, falling back for json extensions."""
+
+        raw = data.encode("utf-8", "surrogatepass") if isinstance(data, str) else data
+        if self.WIDE_INTEGER in raw.translate(self.DIGITS):
+            return super().loads(data)
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return super().loads(data)
+
+    def dumps(self, o: Any, **options) -> str:
+        """Encode a document, falling back if options are unsupported."""
+
+        indent = options.pop("indent", None)
+        if options or indent not in (None, 2):
+            return super().dumps(o, indent=indent, **options)
+
+        if _has_non_finite(o):
+            return super().dumps(o, indent=indent)
+
+        flags = orjson.OPT_NON_STR_KEYS
+        if indent == 2:
+            flags |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(o, option=flags).decode()
+        except TypeError:
+            return super().dumps(o, indent=indent)
+
+
+BACKENDS: Dict[str, Backend] = {"json": Backend()}
+if orjson is not None:
+    BACKENDS["orjson"] = OrjsonBackend()
+
+# The standard library by default so output does not depend on what is installed
+backend: Backend = BACKENDS["json"]
+
+
+def set_backend(name: Optional[str] = None):
+    """Choose a backend by name, such as orjson, or json if None."""
+
+    global backend
+    if name is None:
+        backend = BACKENDS["json"]
+    elif name not in BACKENDS:
+        raise ValueError(f"serialization backend {name} is not available")
+    else:
+        backend = BACKENDS[name]
+
+
+def dumps(o: Any, **options) -> str:
+    """Encode an object with the current backend."""
+
+    return backend.dumps(o, **options)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Decode data with the current backend."""
+
+    return backend.loads(data)
+
+
 def dump(o: Any, file: TextIO, no_truncate: bool = False, **options):
     """Write an object to a file."""
 
     if not no_truncate:
         descend_and_truncate(o, 100_000)
-    json.dump(o, file, **options)
+    file.write(backend.dumps(o, **options))
 
 
 def load(file: TextIO):
     """Read data from a file."""
 
-    return json.load(file)
+    return backend.loads(file.read())
+
+
+class ReportWriter:
+    """Write report records as JSON Lines as soon as they are ready.
+
+    Each record is truncated while it is encoded, written on its own
+    line and flushed, so memory use does not grow with the report and
+    everything written so far survives if grading is interrupted. A
+    length of zero or less disables truncation.
+    """
+
+    file: TextIO
+    length: int
+    count: int
+
+    def __init__(self, file: TextIO, length: int = 100_000):
+        self.file = file
+        self.length = length
+        self.count = 0
+
+    def write(self, record: Any):
+        """Encode and flush a single record."""
+
+        if self.length > 0:
+            record = truncated(record, self.length)
+        self.file.write(backend.dumps(record))
+        self.file.write("\n")
+        self.file.flush()
+        self.count += 1
+
+    def write_all(self, records: Iterable[Any]):
+        """Write records from an iterable, one at a time."""
+
+        for record in records:
+            self.write(record)
+
+    def __enter__(self) -> "ReportWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.file.flush()
+
+
+def read_report(file: TextIO) -> Iterator[Any]:
+    """Lazily decode the records of a JSON Lines report.
+
+    A final line that was cut off mid-write, because the writer was
+    killed, is skipped rather than raising.
+    """
+
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            yield backend.loads(line)
+        except ValueError:
+            if line.endswith("\n"):
+                raise
+            return
+
+
+ARCHIVE_MAGIC = b"CRA1"
+ARCHIVE_FOOTER = struct.Struct("<QQ4s")
+
+# Identifier stored in the header, compress and decompress
+ARCHIVE_CODECS: Dict[str, Tuple[int, Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "gzip": (1, partial(gzip.compress, compresslevel=6), gzip.decompress),
+    "lzma": (2, lzma.compress, lzma.decompress),}
+
+
+class ArchiveWriter:
+    """Write keyed report records into a compressed, indexed archive.
+
+    Records are encoded as JSON Lines and grouped into independently
+    compressed blocks of roughly block_size bytes. On close, an index
+    from each key to its block and position is written at the end of
+    the file, followed by a fixed size footer locating the index, so a
+    reader only has to decompress the block holding the record it
+    wants. Records are truncated while being encoded as in dump.
+    """
+
+    file: BinaryIO
+    codec: str
+    block_size: int
+    length: int
+
+    def __init__(self, file: BinaryIO, codec: str = "gzip", block_size: int = 256 * 1024, length: int = 100_000):
+        if codec not in ARCHIVE_CODECS:
+            raise ValueError(f"unknown archive codec {codec}")
+
+        self.file = file
+        self.codec = codec
+        self.block_size = block_size
+        self.length = length
+
+        self._identifier, self._compress, _ = ARCHIVE_CODECS[codec]
+        self._block = bytearray()
+        self._pending: List[Tuple[str, int, int]] = []
+        self._blocks: List[Tuple[int, int]] = []
+        self._index: Dict[str, Tuple[int, int, int]] = {}
+        self._keys = set()
+        self._closed = False
+
+        self.file.write(ARCHIVE_MAGIC + bytes((self._identifier,)))
+
+    def write(self, key: str, record: Any):
+        """Add a record, which must have a unique key."""
+
+        if key in self._keys:
+            raise ValueError(f"duplicate archive key {key}")
+        self._keys.add(key)
+        if self.length > 0:
+            record = truncated(record, self.length)
+
+        start = len(self._block)
+        self._block += backend.dumps(record).encode()
+        self._pending.append((key, start, len(self._block)))
+        self._block += b"\n"
+        if len(self._block) >= self.block_size:
+            self._flush()
+
+    def _flush(self):
+        """Compress and write out the current block."""
+
+        if not self._pending:
+            return
+        data = self._compress(bytes(self._block))
+        block = len(self._blocks)
+        self._blocks.append((self.file.tell(), len(data)))
+        self.file.write(data)
+        for key, start, end in self._pending:
+            self._index[key] = (block, start, end)
+        self._block.clear()
+        self._pending.clear()
+
+    def close(self):
+        """Write the last block, the index and the footer."""
+
+        if self._closed:
+            return
+        self._flush()
+        index = self._compress(json.dumps(dict(blocks=self._blocks, records=self._index)).encode())
+        offset = self.file.tell()
+        self.file.write(index)
+        self.file.write(ARCHIVE_FOOTER.pack(offset, len(index), ARCHIVE_MAGIC))
+        self.file.flush()
+        self._closed = True
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class Archive:
+    """Random access reader for archives made by ArchiveWriter.
+
+    Only the index is read up front. The most recently decompressed
+    block is kept, so reading records in archive order decompresses
+    each block once.
+    """
+
+    file: BinaryIO
+    codec: str
+
+    def __init__(self, file: BinaryIO):
+        self.file = file
+
+        header = file.read(len(ARCHIVE_MAGIC) + 1)
+        if len(header) != len(ARCHIVE_MAGIC) + 1 or header[:-1] != ARCHIVE_MAGIC:
+            raise ValueError("not a report archive")
+        for name, (identifier, _, decompress) in ARCHIVE_CODECS.items():
+            if identifier == header[-1]:
+                self.codec = name
+                self._decompress = decompress
+                break
+        else:
+            raise ValueError(f"unknown archive codec {header[-1]}")
+
+        # A writer that never finished leaves no room for the footer
+        if file.seek(0, 2) < len(ARCHIVE_MAGIC) + 1 + ARCHIVE_FOOTER.size:
+            raise ValueError("report archive is incomplete")
+        file.seek(-ARCHIVE_FOOTER.size, 2)
+        offset, length, magic = ARCHIVE_FOOTER.unpack(file.read(ARCHIVE_FOOTER.size))
+        if magic != ARCHIVE_MAGIC:
+            raise ValueError("report archive is incomplete")
+        file.seek(offset)
+        index = json.loads(self._decompress(file.read(length)))
+
+        self._blocks: List[Tuple[int, int]] = [tuple(block) for block in index["blocks"]]
+        self._index: Dict[str, Tuple[int, int, int]] = {key: tuple(entry) for key, entry in index["records"].items()}
+        self._cached: Optional[Tuple[int, bytes]] = None
+
+    def _block(self, block: int) -> bytes:
+        """Decompress a block, reusing the last one."""
+
+        if self._cached is None or self._cached[0] != block:
+            offset, length = self._blocks[block]
+            self.file.seek(offset)
+            self._cached = block, self._decompress(self.file.read(length))
+        return self._cached[1]
+
+    def keys(self) -> Iterable[str]:
+        """All record keys in the order they were written."""
+
+        return self._index.keys()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def read(self, key: str) -> Any:
+        """Decode a single record, raising KeyError if missing."""
+
+        block, start, end = self._index[key]
+        return backend.loads(self._block(block)[start:end])
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        """Yield every key and record in archive order."""
+
+        for key in self._index:
+            yield key, self.read(key)
@@ -0,0 +1,91 @@
+import os
+import sys
+import marshal
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+from . import serialization
+
+__all__ = ("sidecar_path", "load")
+
+T = TypeVar("T")
+
+# Bump whenever the layout of the header changes
+SIDECAR_FORMAT = 1
+
+
+def sidecar_path(path: Path) -> Path:
+    """Hidden file next to the source, like .index.json.cache."""
+
+    return path.with_name(f".{path.name}.cache")
+
+
+def _header(stat: os.stat_result, stamp: Any) -> tuple:
+    """Everything that has to match for a sidecar to be trusted.
+
+    Marshal output is only guaranteed to be readable by the same
+    interpreter version, so the implementation is included.
+    """
+
+    return SIDECAR_FORMAT, sys.implementation.cache_tag, stamp, stat.st_mtime_ns, stat.st_size
+
+
+def _read(path: Path, header: tuple) -> Any:
+    """Return the packed payload, or raise LookupError if stale.
+
+    The file is read in one go since marshal.load issues a read call
+    for every object it decodes.
+    """
+
+    stored, packed = marshal.loads(path.read_bytes())
+    if stored != header:
+        raise LookupError("stale sidecar")
+    return packed
+
+
+def _write(path: Path, header: tuple, packed: Any):
+    """Atomically replace the sidecar, leaving no partial file behind."""
+
+    descriptor, temporary = tempfile.mkstemp(prefix=f"{path.name}.", dir=str(path.parent))
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(marshal.dumps((header, packed)))
+        os.replace(temporary, str(path))
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def load(
+        path: Path,
+        decode: Callable[[Any], T],
+        pack: Callable[[T], Any],
+        unpack: Callable[[Any], T],
+        stamp: Any = None) -> T:
+    """Load a JSON file through a precompiled sidecar.
+
+    If a sidecar matching the source's modification time and size and
+    the caller's stamp exists, the packed primitives it holds are
+    passed to unpack and no JSON is parsed. Otherwise the JSON is
+    decoded, and pack must reduce the result to values marshal can
+    store for next time. Sidecars are best effort: if the directory is
+    read-only, the result cannot be marshalled or unpack rejects what
+    was stored, the JSON is used.
+    """
+
+    stat = path.stat()
+    header = _header(stat, stamp)
+    cache_path = sidecar_path(path)
+
+    try:
+        return unpack(_read(cache_path, header))
+    except (OSError, EOFError, ValueError, TypeError, LookupError):
+        pass
+
+    result = decode(serialization.loads(path.read_bytes()))
+    try:
+        _write(cache_path, header, pack(result))
+    except (OSError, ValueError):
+        pass
+    return result
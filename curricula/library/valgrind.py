@@ -1,13 +1,20 @@
 import os
-from xml.etree.ElementTree import Element, parse, ParseError
-from typing import Optional, List
-from dataclasses import dataclass, field
+from collections import Counter
+from xml.etree.ElementTree import Element, iterparse, ParseError
+from typing import Optional, List, Iterable, Dict, Tuple, BinaryIO
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from . import process
+from .files import temporary_directory
 
 VALGRIND_ARGS = ("valgrind", "--tool=memcheck", "--leak-check=yes", "--xml=yes")
 VALGRIND_XML_FILE = "valgrind.xml"
+VALGRIND_LEAK_KINDS = ("Leak_DefinitelyLost", "Leak_IndirectlyLost", "Leak_PossiblyLost")
+
+# Default number of error objects kept per report
+VALGRIND_MAX_ERRORS = 1000
 
 
 @dataclass
@@ -53,50 +60,143 @@ class ValgrindError:
         unique = int(element.find("unique").text, 16)
         tid = int(element.find("tid").text)
         kind = element.find("kind").text
-        what = ValgrindWhat.load(element.find("what") or element.find("xwhat"))
-        return cls(unique, tid, kind, what)
+        what = element.find("what")
+        if what is None:
+            what = element.find("xwhat")
+        return cls(unique, tid, kind, ValgrindWhat.load(what))
 
 
 @dataclass
 class ValgrindReport:
-    """Include data about memory lost and errors."""
+    """Include data about memory lost and errors.
+
+    Only the first few errors are kept as objects, but the counts and
+    leak totals cover every error in the report.
+    """
 
     runtime: process.Runtime
     valgrind_errors: Optional[List[ValgrindError]]
     error: str = None
 
+    # Aggregated over all errors, including ones that were not kept
+    error_counts: Dict[str, int] = field(default_factory=dict)
+    leaked_blocks: int = 0
+    leaked_bytes: int = 0
+
     def memory_lost(self) -> (int, int):
         """Count up bytes and blocks lost."""
 
-        leaked_blocks = 0
-        leaked_bytes = 0
-        for error in self.valgrind_errors:
-            if error.kind in ("Leak_DefinitelyLost", "Leak_IndirectlyLost", "Leak_PossiblyLost"):
-                leaked_blocks += int(error.what.fields["leakedblocks"])
-                leaked_bytes += int(error.what.fields["leakedbytes"])
-        return leaked_blocks, leaked_bytes
-
-
-def run(*args: str, stdin: bytes = None, timeout: float = None, cwd: Path = None) -> Optional[ValgrindReport]:
-    """Run valgrind on the program and return IR count."""
-
-    runtime = process.run(
-        *VALGRIND_ARGS,
-        f"--xml-file={VALGRIND_XML_FILE}",
-        *args,
-        stdin=stdin,
-        timeout=timeout,
-        cwd=cwd)
-    if os.path.exists(VALGRIND_XML_FILE):
-        errors = []
-        with open(VALGRIND_XML_FILE) as file:
-            try:
-                root = parse(file).getroot()
-            except ParseError:
-                return ValgrindReport(runtime, None, error="cannot parse valgrind xml")
-            for child in root:
-                if child.tag == "error":
-                    errors.append(ValgrindError.load(child))
-        os.remove(VALGRIND_XML_FILE)
-        return ValgrindReport(runtime=runtime, valgrind_errors=errors)
+        return self.leaked_blocks, self.leaked_bytes
+
+    def dump(self, limit: int = process.STREAM_DUMP_LIMIT) -> dict:
+        """Serialize, truncating the runtime's streams before decoding."""
+
+        return dict(
+            runtime=self.runtime.dump(limit),
+            valgrind_errors=[asdict(error) for error in self.valgrind_errors] if self.valgrind_errors is not None else None,
+            error=self.error,
+            error_counts=self.error_counts,
+            leaked_blocks=self.leaked_blocks,
+            leaked_bytes=self.leaked_bytes)
+
+
+def parse_errors(
+        file: BinaryIO,
+        max_errors: Optional[int] = VALGRIND_MAX_ERRORS) -> Tuple[List[ValgrindError], Counter, int, int]:
+    """Incrementally parse a valgrind XML report.
+
+    Each top-level error is cleared as soon as it has been counted, so
+    memory stays flat regardless of report size. At most max_errors
+    error objects are returned; None means no limit. Also returns the
+    count of errors by kind and the leaked blocks and bytes.
+    """
+
+    errors = []
+    counts = Counter()
+    leaked_blocks = 0
+    leaked_bytes = 0
+
+    root = None
+    depth = 0
+    for event, element in iterparse(file, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth != 1 or element.tag != "error":
+            continue
+
+        valgrind_error = ValgrindError.load(element)
+        counts[valgrind_error.kind] += 1
+        if valgrind_error.kind in VALGRIND_LEAK_KINDS:
+            leaked_blocks += int(valgrind_error.what.fields["leakedblocks"])
+            leaked_bytes += int(valgrind_error.what.fields["leakedbytes"])
+        if max_errors is None or len(errors) < max_errors:
+            errors.append(valgrind_error)
+
+        # Drop everything parsed so far
+        root.clear()
+
+    return errors, counts, leaked_blocks, leaked_bytes
+
+
+def run(
+        *args: str,
+        stdin: bytes = None,
+        timeout: float = None,
+        cwd: Path = None,
+        max_errors: Optional[int] = VALGRIND_MAX_ERRORS) -> Optional[ValgrindReport]:
+    """Run valgrind on the program and return IR count.
+
+    The XML report is written to a private temporary directory, so
+    any number of runs may happen concurrently in the same cwd.
+    """
+
+    with temporary_directory(prefix="curricula-valgrind-") as directory:
+        xml_path = directory.joinpath(VALGRIND_XML_FILE)
+        runtime = process.run(
+            *VALGRIND_ARGS,
+            f"--xml-file={xml_path}",
+            *args,
+            stdin=stdin,
+            timeout=timeout,
+            cwd=cwd)
+        if xml_path.exists():
+            with xml_path.open("rb") as file:
+                try:
+                    errors, counts, leaked_blocks, leaked_bytes = parse_errors(file, max_errors=max_errors)
+                except ParseError:
+                    return ValgrindReport(runtime, None, error="cannot parse valgrind xml")
+            return ValgrindReport(
+                runtime=runtime,
+                valgrind_errors=errors,
+                error_counts=dict(counts),
+                leaked_blocks=leaked_blocks,
+                leaked_bytes=leaked_bytes)
     return ValgrindReport(runtime=runtime, valgrind_errors=None, error="valgrind did not write to output")
+
+
+def run_batch(
+        invocations: Iterable[process.Invocation],
+        concurrency: int = None,
+        max_errors: Optional[int] = VALGRIND_MAX_ERRORS) -> List[ValgrindReport]:
+    """Run memcheck on many invocations at once, preserving order.
+
+    Only the arguments, stdin, timeout and cwd of each invocation are
+    used. If concurrency is None, it defaults to the number of
+    processors.
+    """
+
+    def run_one(invocation: process.Invocation) -> ValgrindReport:
+        return run(
+            *invocation.args,
+            stdin=invocation.stdin,
+            timeout=invocation.timeout,
+            cwd=invocation.cwd,
+            max_errors=max_errors)
+
+    with ThreadPoolExecutor(max_workers=concurrency or os.cpu_count()) as executor:
+        return list(executor.map(run_one, invocations))
@@ -1,24 +1,57 @@
 import time
+import weakref
 import datetime
 
 from decimal import Decimal
 from pathlib import Path
-from dataclasses import dataclass, asdict, field
-from typing import Optional, List, Callable, TypeVar
+from dataclasses import dataclass, asdict, field, fields, MISSING
+from typing import Optional, List, Callable, TypeVar, Any, Iterable, Iterator, Dict, Union, Sequence
 from abc import ABC, abstractmethod
-from functools import lru_cache
+from collections import abc
+from functools import lru_cache, partial
 
 from .version import version
+from .library import sidecar
 
 TZ = datetime.timezone(offset=datetime.timedelta(seconds=time.timezone))
 
+# Bump whenever the tuples built by the pack methods change layout
+PACK_FORMAT = 1
+
 
 def deserialize_datetime(s: str) -> Optional[datetime.datetime]:
-    """Deserialize our standard format."""
+    """Deserialize our standard format.
+
+    Our format is a subset of ISO 8601, so the much faster ISO parser
+    is tried before falling back to strptime.
+    """
 
     if s is None:
         return None
-    return datetime.datetime.strptime(s, "%Y-%m-%d %H:%M:%S").replace(tzinfo=TZ)
+    try:
+        return datetime.datetime.fromisoformat(s).replace(tzinfo=TZ)
+    except ValueError:
+        return datetime.datetime.strptime(s, "%Y-%m-%d %H:%M:%S").replace(tzinfo=TZ)
+
+
+@lru_cache(maxsize=4096)
+def deserialize_decimal(value: Any) -> Decimal:
+    """Share decimals, since the same weights and points repeat.
+
+    Decimal is immutable, so reusing instances is safe.
+    """
+
+    return Decimal(value)
+
+
+def intern_decimal(decimals: Dict[str, int], value: Decimal) -> int:
+    """Number each distinct decimal for packing.
+
+    Keyed by string so that equal decimals with different exponents,
+    like 1 and 1.0, are kept exact.
+    """
+
+    return decimals.setdefault(str(value), len(decimals))
 
 
 def serialize_datetime(d: datetime) -> Optional[str]:
@@ -41,10 +74,226 @@ def some(value: Optional[T], method: Callable[[T], U]) -> Optional[U]:
     return method(value)
 
 
+class Backlink:
+    """Descriptor for a reference to a parent model that is held weakly.
+
+    Children link back to the models that contain them, so storing a
+    strong reference would create a cycle for every loaded model.
+    """
+
+    slot: str
+
+    def __set_name__(self, owner: type, name: str):
+        self.slot = f"_{name}_reference"
+
+    def __get__(self, instance: Any, owner: type = None) -> Any:
+        """Dereference, returning None if the parent is gone."""
+
+        if instance is None:
+            return None
+        reference = getattr(instance, self.slot, None)
+        return reference() if reference is not None else None
+
+    def __set__(self, instance: Any, value: Any):
+        object.__setattr__(instance, self.slot, weakref.ref(value) if value is not None else None)
+
+
+class Aggregates:
+    """Generation counter for cached aggregates.
+
+    Every assignment owns one, shared by all of the models it contains.
+    Models bump the generation of their scope whenever a field that an
+    aggregate depends on is assigned. Cached aggregates remember the
+    scope and generation they were computed at and are recomputed once
+    either changes, so mutating one assignment never invalidates the
+    caches of another.
+    """
+
+    __slots__ = ("generation",)
+
+    def __init__(self):
+        self.generation = 0
+
+
+# Scope of models that are not part of an assignment
+UNOWNED = Aggregates()
+
+
+def scope_of(model: Any) -> Aggregates:
+    """Get the aggregate scope a model belongs to."""
+
+    return getattr(model, "_aggregates", UNOWNED)
+
+
+def adopt(value: Any, scope: Aggregates):
+    """Move a model, a list of models or lazy problems and everything they contain into a scope.
+
+    Backlinks are not followed, so only descendants are adopted.
+    """
+
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            adopt(item, scope)
+    elif isinstance(value, LazyProblems):
+        for problem in value.materialized():
+            adopt(problem, scope)
+    elif isinstance(value, Model) and hasattr(type(value), "_adopted_fields"):
+        if getattr(value, "_aggregates", None) is scope:
+            return
+        object.__setattr__(value, "_aggregates", scope)
+        for name in value._adopted_fields:
+            adopt(getattr(value, name), scope)
+
+
+class aggregate:
+    """Per-instance cached property invalidated by Aggregates."""
+
+    def __init__(self, function: Callable[[Any], T]):
+        self.function = function
+        self.slot = f"_{function.__name__.lstrip('_')}_cache"
+        self.__doc__ = function.__doc__
+
+    def __get__(self, instance: Any, owner: type = None) -> Any:
+        if instance is None:
+            return self
+        scope = scope_of(instance)
+        cached = getattr(instance, self.slot, None)
+        if cached is not None and cached[0] is scope and cached[1] == scope.generation:
+            return cached[2]
+        generation = scope.generation
+        value = self.function(instance)
+        object.__setattr__(instance, self.slot, (scope, generation, value))
+        return value
+
+
+def compile_init(cls: type) -> Callable[..., None]:
+    """Generate an __init__ that bypasses a custom __setattr__.
+
+    A new instance cannot be part of a cached aggregate yet, so there
+    is nothing to invalidate while it is being constructed. Fields are
+    assigned with object.__setattr__, which still honors descriptors.
+    """
+
+    scope = {"_set": object.__setattr__, "_MISSING": MISSING}
+    parameters = []
+    body = []
+    for model_field in fields(cls):
+        name = model_field.name
+        if model_field.default is not MISSING:
+            scope[f"_default_{name}"] = model_field.default
+            parameters.append(f"{name}=_default_{name}")
+            body.append(f"_set(self, {name!r}, {name})")
+        elif model_field.default_factory is not MISSING:
+            scope[f"_factory_{name}"] = model_field.default_factory
+            parameters.append(f"{name}=_MISSING")
+            body.append(f"_set(self, {name!r}, _factory_{name}() if {name} is _MISSING else {name})")
+        else:
+            parameters.append(name)
+            body.append(f"_set(self, {name!r}, {name})")
+
+    if hasattr(cls, "__post_init__"):
+        body.append("self.__post_init__()")
+
+    source = f"def __init__(self, {', '.join(parameters)}):\n    " + "\n    ".join(body or ["pass"])
+    exec(source, scope)
+    return scope["__init__"]
+
+
+def slotted(invalidates: Iterable[str] = (), contains: Iterable[str] = ()) -> Callable[[type], type]:
+    """Rebuild a dataclass with __slots__.
+
+    Equivalent to dataclass(slots=True) from Python 3.10, but also
+    allocates the private slots used by Backlink and aggregate. Fields
+    listed in invalidates bump the generation of the model's aggregate
+    scope when set after construction, and models assigned to them
+    join that scope, even if it is UNOWNED, so that they leave the
+    scope of any assignment they were taken from. Models in those
+    fields and in contains are adopted along with their container.
+    """
+
+    invalidates = frozenset(invalidates)
+    contains = tuple(contains)
+
+    def decorator(cls: type) -> type:
+        namespace = dict(cls.__dict__)
+        own = cls.__dict__.get("__annotations__", {})
+
+        slots = []
+        for model_field in fields(cls):
+            if model_field.name not in own:
+                continue
+            if isinstance(namespace.get(model_field.name), Backlink):
+                continue
+            slots.append(model_field.name)
+            namespace.pop(model_field.name, None)
+        for value in cls.__dict__.values():
+            if isinstance(value, (Backlink, aggregate)):
+                slots.append(value.slot)
+
+        if invalidates:
+            slots.append("_aggregates")
+
+        namespace["__slots__"] = tuple(slots)
+        namespace.pop("__dict__", None)
+        namespace.pop("__weakref__", None)
+
+        if invalidates:
+            backlinks = {name for name, value in cls.__dict__.items() if isinstance(value, Backlink)}
+            namespace["_adopted_fields"] = tuple(
+                model_field.name for model_field in fields(cls)
+                if (model_field.name in invalidates or model_field.name in contains)
+                and model_field.name not in backlinks)
+
+            def __setattr__(self, name: str, value: Any):
+                if name in invalidates:
+                    scope = scope_of(self)
+                    scope.generation += 1
+                    object.__setattr__(self, name, value)
+                    if name not in backlinks:
+                        adopt(value, scope)
+                else:
+                    object.__setattr__(self, name, value)
+            namespace["__setattr__"] = __setattr__
+            namespace["__init__"] = compile_init(cls)
+
+        rebuilt = type(cls)(cls.__name__, cls.__bases__, namespace)
+        rebuilt.__qualname__ = cls.__qualname__
+        return rebuilt
+
+    return decorator
+
+
 @dataclass(eq=False)
 class Model(ABC):
     """Provide some default behaviors."""
 
+    __slots__ = ("__weakref__",)
+
+    def __getstate__(self) -> dict:
+        """Pickle fields only.
+
+        Weak backlinks cannot be pickled, and cached aggregates and
+        their scope are per process. Containers relink their children
+        when unpickled.
+        """
+
+        state = {}
+        for cls in type(self).__mro__:
+            for slot in cls.__dict__.get("__slots__", ()):
+                if slot == "__weakref__" or slot == "_aggregates" or slot.endswith(("_reference", "_cache")):
+                    continue
+                try:
+                    state[slot] = object.__getattribute__(self, slot)
+                except AttributeError:
+                    continue
+        return state
+
+    def __setstate__(self, state: dict):
+        """Restore fields without invalidating anything."""
+
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
     def dump(self) -> dict:
         return asdict(self)
 
@@ -54,6 +303,7 @@ class Model(ABC):
         """Load the model from serialized data."""
 
 
+@slotted()
 @dataclass(eq=False)
 class Author(Model):
     """Name and email."""
@@ -67,7 +317,19 @@ class Author(Model):
 
         return Author(name=data.pop("name"), email=data.pop("email"))
 
+    def pack(self) -> tuple:
+        """Reduce to primitives for the sidecar cache."""
+
+        return self.name, self.email
+
+    @classmethod
+    def unpack(cls, packed: tuple) -> "Author":
+        """Inverse of pack."""
+
+        return cls(*packed)
+
 
+@slotted(invalidates=("weight", "enabled"))
 @dataclass(eq=False)
 class ProblemGradingCategory(Model):
     """Data about weight, points, etc."""
@@ -90,8 +352,8 @@ class ProblemGradingCategory(Model):
             enabled=data.get("enabled", True),
             name=data["name"],
             minutes=data.get("minutes"),
-            weight=Decimal(data["weight"]),
-            points=Decimal(data["points"]),)
+            weight=deserialize_decimal(data["weight"]),
+            points=deserialize_decimal(data["points"]),)
 
     def dump(self) -> dict:
         """Use string format."""
@@ -103,7 +365,25 @@ class ProblemGradingCategory(Model):
             weight=str(self.weight),
             points=str(self.points),)
 
+    def pack(self, decimals: Dict[str, int]) -> tuple:
+        """Reduce to primitives, numbering decimals."""
 
+        return (
+            self.enabled,
+            self.name,
+            self.minutes,
+            intern_decimal(decimals, self.weight),
+            intern_decimal(decimals, self.points))
+
+    @classmethod
+    def unpack(cls, packed: tuple, decimals: List[Decimal]) -> "ProblemGradingCategory":
+        """Inverse of pack."""
+
+        enabled, name, minutes, weight, points = packed
+        return cls(enabled=enabled, name=name, minutes=minutes, weight=decimals[weight], points=decimals[points])
+
+
+@slotted(invalidates=("weight", "enabled", "automated", "review", "manual"))
 @dataclass(eq=False)
 class ProblemGrading(Model):
     """Data for each grading method."""
@@ -117,6 +397,9 @@ class ProblemGrading(Model):
     review: Optional[ProblemGradingCategory] = None
     manual: Optional[ProblemGradingCategory] = None
 
+    # Set by the problem that owns this grading
+    problem = Backlink()
+
     @property
     def is_automated(self) -> bool:
         return self.enabled and self.automated is not None and self.automated.enabled
@@ -129,8 +412,7 @@ class ProblemGrading(Model):
     def is_manual(self) -> bool:
         return self.enabled and self.manual is not None and self.manual.enabled
 
-    @property
-    @lru_cache(maxsize=1)
+    @aggregate
     def weight_total(self) -> Decimal:
         return sum((
             self.automated.weight if self.automated and self.automated.enabled else 0,
@@ -162,8 +444,8 @@ class ProblemGrading(Model):
 
         return cls(
             enabled=data.get("enabled", True),
-            weight=Decimal(data["weight"]),
-            points=Decimal(data["points"]),
+            weight=deserialize_decimal(data["weight"]),
+            points=deserialize_decimal(data["points"]),
             automated=some(data["automated"], ProblemGradingCategory.load),
             review=some(data["review"], ProblemGradingCategory.load),
             manual=some(data["manual"], ProblemGradingCategory.load),)
@@ -179,7 +461,32 @@ class ProblemGrading(Model):
             review=some(self.review, ProblemGradingCategory.dump),
             manual=some(self.manual, ProblemGradingCategory.dump),)
 
+    def pack(self, decimals: Dict[str, int]) -> tuple:
+        """Reduce to primitives, numbering decimals."""
 
+        return (
+            self.enabled,
+            intern_decimal(decimals, self.weight),
+            intern_decimal(decimals, self.points),
+            some(self.automated, lambda category: category.pack(decimals)),
+            some(self.review, lambda category: category.pack(decimals)),
+            some(self.manual, lambda category: category.pack(decimals)))
+
+    @classmethod
+    def unpack(cls, packed: tuple, decimals: List[Decimal]) -> "ProblemGrading":
+        """Inverse of pack."""
+
+        enabled, weight, points, automated, review, manual = packed
+        return cls(
+            enabled=enabled,
+            weight=decimals[weight],
+            points=decimals[points],
+            automated=some(automated, lambda category: ProblemGradingCategory.unpack(category, decimals)),
+            review=some(review, lambda category: ProblemGradingCategory.unpack(category, decimals)),
+            manual=some(manual, lambda category: ProblemGradingCategory.unpack(category, decimals)))
+
+
+@slotted(invalidates=("grading",))
 @dataclass(eq=False)
 class Problem(Model):
     """All problem data."""
@@ -201,7 +508,7 @@ class Problem(Model):
     difficulty: Optional[str] = None
 
     # Backlink
-    assignment: "Assignment" = None
+    assignment: "Assignment" = Backlink()
 
     @classmethod
     def load(cls, data: dict, assignment: "Assignment" = None) -> "Problem":
@@ -233,13 +540,142 @@ class Problem(Model):
             notes=self.notes,
             difficulty=self.difficulty,)
 
+    def pack(self, decimals: Dict[str, int]) -> tuple:
+        """Reduce to primitives, numbering decimals."""
+
+        return (
+            self.short,
+            self.title,
+            str(self.relative_path),
+            self.grading.pack(decimals),
+            tuple(author.pack() for author in self.authors),
+            tuple(self.topics),
+            self.notes,
+            self.difficulty)
+
+    @classmethod
+    def unpack(cls, packed: tuple, decimals: List[Decimal], assignment: "Assignment" = None) -> "Problem":
+        """Inverse of pack."""
+
+        short, title, relative_path, grading, authors, topics, notes, difficulty = packed
+        self = cls(
+            assignment=assignment,
+            short=short,
+            title=title,
+            relative_path=Path(relative_path),
+            grading=ProblemGrading.unpack(grading, decimals),
+            authors=list(map(Author.unpack, authors)),
+            topics=list(topics),
+            notes=notes,
+            difficulty=difficulty)
+        self.grading.problem = self
+        return self
+
+    def __setstate__(self, state: dict):
+        """Relink the grading after unpickling."""
+
+        Model.__setstate__(self, state)
+        self.grading.problem = self
+
+
+class LazyProblems(abc.Sequence):
+    """Read-only problem list that loads each record on first access.
+
+    Records are indexed by short without being parsed, so looking up
+    a single problem only pays for that problem. Iterating or indexing
+    behaves like the list of fully loaded problems. Records are JSON
+    dictionaries by default; pass load and shorts to use another form.
+    """
+
+    _records: Sequence[Any]
+    _load_record: Callable[[Any, Optional["Assignment"]], Problem]
+    _problems: List[Optional[Problem]]
+    _index: Dict[str, int]
+    _assignment: Optional[weakref.ref]
+
+    def __init__(
+            self,
+            records: Sequence[Any],
+            load: Callable[[Any, Optional["Assignment"]], Problem] = Problem.load,
+            shorts: Iterable[str] = None):
+        self._records = records
+        self._load_record = load
+        self._problems = [None] * len(records)
+        if shorts is None:
+            shorts = (record["short"] for record in records)
+        self._index = {short: i for i, short in enumerate(shorts)}
+        self._assignment = None
+
+    def bind(self, assignment: "Assignment"):
+        """Set the assignment that loaded problems link back to."""
+
+        self._assignment = weakref.ref(assignment)
+        for problem in self._problems:
+            if problem is not None:
+                problem.assignment = assignment
+
+    def _load(self, index: int) -> Problem:
+        """Materialize a problem if it hasn't been yet."""
+
+        problem = self._problems[index]
+        if problem is None:
+            assignment = self._assignment() if self._assignment is not None else None
+            problem = self._problems[index] = self._load_record(self._records[index], assignment)
+            if assignment is not None:
+                adopt(problem, scope_of(assignment))
+        return problem
+
+    def materialized(self) -> Iterator[Problem]:
+        """Problems that have already been loaded."""
+
+        return (problem for problem in self._problems if problem is not None)
+
+    def __reduce__(self):
+        """Pickle as a plain list, loading every problem."""
+
+        return list, (list(self),)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __repr__(self) -> str:
+        return f"LazyProblems({len(self)} problems, {self.loaded} loaded)"
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Problem, List[Problem]]:
+        if isinstance(index, slice):
+            return [self._load(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("problem index out of range")
+        return self._load(index)
+
+    def __iter__(self) -> Iterator[Problem]:
+        for i in range(len(self)):
+            yield self._load(i)
+
+    def get(self, short: str) -> Optional[Problem]:
+        """Load only the problem with the given short."""
+
+        index = self._index.get(short)
+        if index is None:
+            return None
+        return self._load(index)
+
+    @property
+    def loaded(self) -> int:
+        """How many problems have been materialized."""
+
+        return sum(problem is not None for problem in self._problems)
+
 
+@slotted(invalidates=("assignment",))
 @dataclass(eq=False)
 class AssignmentGrading(Model):
     """Weights and points."""
 
     points: int
-    assignment: "Assignment" = field(default=None)
+    assignment: "Assignment" = Backlink()
 
     @classmethod
     def load(cls, data: dict, assignment: "Assignment" = None) -> "AssignmentGrading":
@@ -247,11 +683,16 @@ class AssignmentGrading(Model):
 
         return cls(points=data["points"], assignment=assignment)
 
-    @lru_cache(maxsize=1)
+    @aggregate
+    def _weight(self) -> Decimal:
+        """Cumulative weight of all problems."""
+
+        return sum(problem.grading.weight for problem in self.assignment.problems)
+
     def weight(self) -> Decimal:
         """Compute cumulative weight of all problems."""
 
-        return sum(problem.grading.weight for problem in self.assignment.problems)
+        return self._weight
 
     def dump(self) -> dict:
         """Avoid recursion."""
@@ -259,6 +700,7 @@ class AssignmentGrading(Model):
         return dict(points=self.points)
 
 
+@slotted()
 @dataclass(eq=False)
 class AssignmentMeta(Model):
     """Metadata about an assignment."""
@@ -281,28 +723,66 @@ class AssignmentMeta(Model):
             built=serialize_datetime(self.built),
             curricula=version,)
 
+    def pack(self) -> tuple:
+        """Reduce to primitives for the sidecar cache."""
+
+        return serialize_datetime(self.built), self.curricula
 
+    @classmethod
+    def unpack(cls, packed: tuple) -> "AssignmentMeta":
+        """Inverse of pack."""
+
+        built, curricula = packed
+        return cls(built=deserialize_datetime(built), curricula=curricula)
+
+
+@slotted(invalidates=("problems",), contains=("grading",))
 @dataclass(eq=False)
 class Assignment(Model):
-    """Contains assignment metadata."""
+    """Contains assignment metadata.
+
+    Assign a new list to problems rather than mutating it in place so
+    that cached aggregates like the total weight are recomputed.
+    """
 
     short: str
     title: str
     authors: List[Author]
 
-    problems: List[Problem]
+    problems: Sequence[Problem]
     grading: AssignmentGrading
 
     notes: Optional[str] = None
-    meta: AssignmentMeta = AssignmentMeta()
+    meta: AssignmentMeta = field(default_factory=AssignmentMeta)
     extra: Optional[dict] = None
 
+    def __post_init__(self):
+        """Start a scope for the aggregates of everything in the assignment."""
+
+        adopt(self, Aggregates())
+
+    def __setstate__(self, state: dict):
+        """Relink children and start a new scope after unpickling."""
+
+        Model.__setstate__(self, state)
+        adopt(self, Aggregates())
+        for problem in self.problems:
+            problem.assignment = self
+        self.grading.assignment = self
+
     @classmethod
-    def load(cls, data: dict, problems: List[Problem] = None) -> "Assignment":
-        """Deserialize."""
+    def load(cls, data: dict, problems: List[Problem] = None, lazy: bool = False) -> "Assignment":
+        """Deserialize.
+
+        If lazy, problems are only loaded when they are first accessed,
+        which is much faster for callers that need just a few.
+        """
 
         if problems is None:
-            problems = list(map(Problem.load, data["problems"]))
+            if lazy:
+                problems = LazyProblems(data["problems"])
+            else:
+                problems = list(map(Problem.load, data["problems"]))
 
         self = cls(
             short=data["short"],
@@ -314,12 +794,95 @@ class Assignment(Model):
             notes=data.get("notes"),
             meta=AssignmentMeta.load(data["meta"]) if "meta" in data else AssignmentMeta())
 
-        for problem in problems:
-            problem.assignment = self
+        if isinstance(problems, LazyProblems):
+            problems.bind(self)
+        else:
+            for problem in problems:
+                problem.assignment = self
         self.grading.assignment = self
 
         return self
 
+    @classmethod
+    def read(cls, path: Path, lazy: bool = False) -> "Assignment":
+        """Load an assignment.json or grading index from disk.
+
+        A compact binary sidecar is kept next to the file and reused
+        while the file's modification time, size, the curricula version
+        and the pack format are unchanged, skipping JSON parsing and
+        per-field decimal construction.
+        """
+
+        return sidecar.load(
+            path,
+            decode=partial(cls.load, lazy=lazy),
+            pack=cls.pack,
+            unpack=partial(cls.unpack, lazy=lazy),
+            stamp=(version, PACK_FORMAT))
+
+    def pack(self) -> tuple:
+        """Reduce to primitives that marshal can store.
+
+        Each distinct decimal is stored once in a table and referred to
+        by index, so unpacking constructs it only once.
+        """
+
+        decimals = {}
+        body = (
+            self.short,
+            self.title,
+            tuple(author.pack() for author in self.authors),
+            tuple(problem.pack(decimals) for problem in self.problems),
+            self.grading.points,
+            self.extra,
+            self.notes,
+            self.meta.pack())
+        return tuple(decimals), body
+
+    @classmethod
+    def unpack(cls, packed: tuple, lazy: bool = False) -> "Assignment":
+        """Inverse of pack, optionally deferring problems like load."""
+
+        table, body = packed
+        decimals = list(map(Decimal, table))
+        short, title, authors, records, points, extra, notes, meta = body
+
+        def load(record: tuple, assignment: Optional[Assignment]) -> Problem:
+            return Problem.unpack(record, decimals, assignment=assignment)
+
+        if lazy:
+            problems = LazyProblems(records, load=load, shorts=(record[0] for record in records))
+        else:
+            problems = [load(record, None) for record in records]
+
+        self = cls(
+            short=short,
+            title=title,
+            authors=list(map(Author.unpack, authors)),
+            problems=problems,
+            grading=AssignmentGrading(points=points),
+            extra=extra,
+            notes=notes,
+            meta=AssignmentMeta.unpack(meta))
+
+        if lazy:
+            problems.bind(self)
+        else:
+            for problem in problems:
+                problem.assignment = self
+        self.grading.assignment = self
+        return self
+
+    def problem(self, short: str) -> Optional[Problem]:
+        """Find a problem by short, loading only that one if lazy."""
+
+        if isinstance(self.problems, LazyProblems):
+            return self.problems.get(short)
+        for problem in self.problems:
+            if problem.short == short:
+                return problem
+        return None
+
     def dump(self) -> dict:
         """Dump the assignment to JSON."""
 